@@ -1599,9 +1599,9 @@ class TrafficAnalyticsEngine:
             
             # Build the response in the expected format
             analytics_dict = {
-                'kpis': kpis.__dict__ if hasattr(kpis, '__dict__') else kpis,
-                'recommendations': [rec.__dict__ if hasattr(rec, '__dict__') else rec for rec in recommendations] if recommendations else [],
-                'time_series': [ts.__dict__ if hasattr(ts, '__dict__') else ts for ts in time_series] if time_series else [],
+                'kpis': kpis.to_dict() if kpis else {},
+                'recommendations': recommendations,
+                'time_series': time_series,
                 'analysis_timestamp': datetime.now().isoformat(),
                 'emissions_data': [],  # Could be populated if needed
                 'safety_data': {},
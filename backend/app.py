@@ -8,13 +8,18 @@ Author: Traffic Simulator Team
 Date: August 2025
 """
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory, stream_with_context
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
+import atexit
+import logging
+import logging.handlers
 import os
+import queue
 import threading
 import time
 import json
+import orjson
 from datetime import datetime
 from pathlib import Path
 from websocket_handler import WebSocketHandler
@@ -22,6 +27,17 @@ from simulation_manager import SimulationManager
 from analytics_engine import TrafficAnalyticsEngine
 from database.service import DatabaseService
 from enhanced_session_manager import EnhancedSessionManager
+from utils.json_response import ojsonify
+
+# Log records go through a queue to a listener thread, so request and worker
+# threads never block on console output. LOG_LEVEL (default INFO) sets the level
+_log_queue = queue.Queue(-1)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+                    format='%(levelname)s %(name)s: %(message)s',
+                    handlers=[logging.handlers.QueueHandler(_log_queue)])
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -63,8 +79,16 @@ osm_service = OSMService(
 @app.before_request
 def log_request_info():
     print(f"DEBUG: {request.method} {request.url} from {request.remote_addr}")
-    if request.is_json and request.get_json():
-        print(f"DEBUG: Request data: {request.get_json()}")
+    if request.is_json:
+        # Malformed bodies are left for the endpoint to reject
+        data = request.get_json(silent=True)
+        if data:
+            print(f"DEBUG: Request data: {data}")
+
+# Release this thread's database session when the request context ends
+@app.teardown_appcontext
+def remove_db_session(exception=None):
+    db_service.Session.remove()
 
 # Legacy simulation state removed - now using multi-session architecture
 
@@ -287,12 +311,9 @@ def stop_simulation():
             }), 400
         
         # Stop all active sessions (for backward compatibility with single-session interface)
-        stopped_sessions = []
-        for session in active_sessions:
-            session_id = session['session_id']
-            stop_result = enhanced_session_manager.stop_simulation(session_id)
-            if stop_result['success']:
-                stopped_sessions.append(session_id)
+        stopped_sessions = enhanced_session_manager.stop_all(
+            [session['session_id'] for session in active_sessions]
+        )
         
         # Notify all connected clients
         websocket_handler.broadcast_simulation_status('stopped', 'All simulations stopped', {
@@ -334,7 +355,7 @@ def get_simulation_data():
         if db_service:
             live_data = db_service.get_latest_live_data(session_id, limit=1)
             if live_data:
-                data = live_data[0].to_dict()
+                data = live_data[0]
                 return jsonify({
                     'success': True,
                     'data': data,
@@ -400,7 +421,7 @@ def handle_data_request():
             if db_service:
                 live_data = db_service.get_latest_live_data(session_id, limit=1)
                 if live_data:
-                    emit('simulation_data', live_data[0].to_dict())
+                    emit('simulation_data', live_data[0])
                     return
             
             # Fallback
@@ -1153,11 +1174,17 @@ def get_sessions():
     """
     try:
         limit = request.args.get('limit', 10, type=int)
-        sessions = db_service.get_recent_sessions(limit)
+        fields = request.args.get('fields')
+        
+        # ?fields=id,status,... returns only those columns
+        if fields:
+            sessions = db_service.get_recent_session_summaries(limit, fields.split(','))
+        else:
+            sessions = [session.to_dict() for session in db_service.get_recent_sessions(limit)]
         
         return jsonify({
             'success': True,
-            'sessions': [session.to_dict() for session in sessions]
+            'sessions': sessions
         })
     except Exception as e:
         return jsonify({
@@ -1287,11 +1314,9 @@ def get_networks_from_database():
     Get networks from database
     """
     try:
-        networks = db_service.get_networks()
-        
         return jsonify({
             'success': True,
-            'networks': [network.to_dict() for network in networks]
+            'networks': db_service.get_network_dicts()
         })
     except Exception as e:
         return jsonify({
@@ -1344,18 +1369,19 @@ def cleanup_old_data():
 @app.route('/api/v2/sessions', methods=['POST'])
 def create_session_v2():
     """Create a new simulation session with enhanced management"""
+    # A missing or malformed body is rejected here rather than raising
+    data = request.get_json(silent=True)
+    network_id = data.get('networkId') if isinstance(data, dict) else None
+    if not network_id:
+        return ojsonify({
+            'success': False,
+            'message': 'Network ID is required'
+        }), 400
+    
+    config = data.get('config', {})
+    enable_gui = data.get('enableGui', True)
+    
     try:
-        data = request.get_json()
-        network_id = data.get('networkId')
-        config = data.get('config', {})
-        enable_gui = data.get('enableGui', True)
-        
-        if not network_id:
-            return jsonify({
-                'success': False,
-                'message': 'Network ID is required'
-            }), 400
-        
         # Create session using enhanced manager
         result = enhanced_session_manager.create_session(
             network_id=network_id,
@@ -1363,10 +1389,10 @@ def create_session_v2():
             enable_gui=enable_gui
         )
         
-        return jsonify(result)
+        return ojsonify(result)
         
     except Exception as e:
-        return jsonify({
+        return ojsonify({
             'success': False,
             'message': f'Error creating session: {str(e)}'
         }), 500
@@ -1376,10 +1402,10 @@ def launch_session_v2(session_id: str):
     """Launch simulation for specific session"""
     try:
         result = enhanced_session_manager.launch_simulation(session_id)
-        return jsonify(result)
+        return ojsonify(result)
         
     except Exception as e:
-        return jsonify({
+        return ojsonify({
             'success': False,
             'message': f'Error launching session: {str(e)}'
         }), 500
@@ -1389,10 +1415,10 @@ def stop_session_v2(session_id: str):
     """Stop simulation for specific session"""
     try:
         result = enhanced_session_manager.stop_simulation(session_id)
-        return jsonify(result)
+        return ojsonify(result)
         
     except Exception as e:
-        return jsonify({
+        return ojsonify({
             'success': False,
             'message': f'Error stopping session: {str(e)}'
         }), 500
@@ -1402,13 +1428,13 @@ def cleanup_session_v2(session_id: str):
     """Clean up session resources"""
     try:
         success = enhanced_session_manager.cleanup_session(session_id)
-        return jsonify({
+        return ojsonify({
             'success': success,
             'message': f'Session {session_id} cleaned up' if success else 'Cleanup failed'
         })
         
     except Exception as e:
-        return jsonify({
+        return ojsonify({
             'success': False,
             'message': f'Error cleaning up session: {str(e)}'
         }), 500
@@ -1419,21 +1445,25 @@ def get_active_sessions_v2():
     try:
         sessions = enhanced_session_manager.get_active_sessions()
         
-        # Enhance with database information
+        # Enhance with database information; the manager's snapshot dicts are
+        # shared, so merge into new dicts, with the in-memory status (newer
+        # than the batched DB row) taking precedence
         if db_service:
+            by_id = db_service.get_sessions_by_ids([session['session_id'] for session in sessions])
+            enhanced = []
             for session in sessions:
-                db_session = db_service.get_session_by_id(session['session_id'])
-                if db_session:
-                    session.update(db_session.to_dict())
+                db_session = by_id.get(session['session_id'])
+                enhanced.append({**db_session.to_dict(), **session} if db_session else session)
+            sessions = enhanced
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'sessions': sessions,
             'total': len(sessions)
         })
         
     except Exception as e:
-        return jsonify({
+        return ojsonify({
             'success': False,
             'message': f'Error retrieving sessions: {str(e)}'
         }), 500
@@ -1443,37 +1473,36 @@ def get_session_status_v2(session_id: str):
     """Get detailed status of specific session"""
     try:
         # Get from enhanced manager
-        active_sessions = enhanced_session_manager.get_active_sessions()
-        session_info = next((s for s in active_sessions if s['session_id'] == session_id), None)
+        session_info = enhanced_session_manager.get_session(session_id)
         
         if not session_info:
             # Check database for completed sessions
             if db_service:
                 db_session = db_service.get_session_by_id(session_id)
                 if db_session:
-                    return jsonify({
+                    return ojsonify({
                         'success': True,
                         'session': db_session.to_dict()
                     })
             
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'message': f'Session {session_id} not found'
             }), 404
         
-        # Enhance with database information
+        # Enhance with database information; in-memory fields are newer
         if db_service:
             db_session = db_service.get_session_by_id(session_id)
             if db_session:
-                session_info.update(db_session.to_dict())
+                session_info = {**db_session.to_dict(), **session_info}
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'session': session_info
         })
         
     except Exception as e:
-        return jsonify({
+        return ojsonify({
             'success': False,
             'message': f'Error retrieving session status: {str(e)}'
         }), 500
@@ -1483,22 +1512,31 @@ def get_session_live_data_v2(session_id: str):
     """Get live data for specific session"""
     try:
         if not db_service:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'message': 'Database service not available'
             }), 500
         
-        # Get latest live data from database
-        live_data = db_service.get_latest_live_data(session_id, limit=100)
+        # Get latest live data from database; the first row is fetched here so
+        # that query errors still produce an error response
+        live_data = db_service.iter_latest_live_data(session_id, limit=100)
+        first = next(live_data, None)
         
-        return jsonify({
-            'success': True,
-            'session_id': session_id,
-            'data': [data.to_dict() for data in live_data]
-        })
+        def generate():
+            # Serialize one row at a time instead of building the whole list
+            yield b'{"success":true,"session_id":' + orjson.dumps(session_id) + b',"data":['
+            if first is not None:
+                yield orjson.dumps(first)
+                for data in live_data:
+                    yield b',' + orjson.dumps(data)
+            yield b']}'
+        
+        # Keep the request context (and its DB session, removed on teardown)
+        # alive until the last row has been streamed
+        return Response(stream_with_context(generate()), mimetype='application/json')
         
     except Exception as e:
-        return jsonify({
+        return ojsonify({
             'success': False,
             'message': f'Error retrieving live data: {str(e)}'
         }), 500
@@ -1510,7 +1548,7 @@ def get_resource_usage_v2():
         active_sessions = enhanced_session_manager.get_active_sessions()
         allocated_ports = enhanced_session_manager.port_allocator.get_allocated_ports()
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'resource_usage': {
                 'active_sessions': len(active_sessions),
@@ -1521,7 +1559,7 @@ def get_resource_usage_v2():
         })
         
     except Exception as e:
-        return jsonify({
+        return ojsonify({
             'success': False,
             'message': f'Error retrieving resource usage: {str(e)}'
         }), 500
@@ -1685,6 +1723,12 @@ if __name__ == '__main__':
             allow_unsafe_werkzeug=True
         )
     finally:
+        # Stop any SUMO processes still running and the session manager's threads
+        try:
+            enhanced_session_manager.shutdown()
+        except:
+            pass
+        
         # Cleanup OSM service on shutdown
         try:
             osm_service.cleanup_wizard()
@@ -8,117 +8,162 @@ Author: Traffic Simulator Team
 Date: September 2025
 """
 
-from sqlalchemy import create_engine, Column, String, Integer, Float, Boolean, Text, DateTime, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-import json
+from sqlalchemy import String, Integer, Float, Boolean, Text, DateTime, Enum, ForeignKey, Index, func
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+import functools
+import operator
+import orjson
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
 
-Base = declarative_base()
+class Base(DeclarativeBase):
+    """Declarative base for all traffic simulator models"""
+    pass
+
+def _dumps(value: Any) -> str:
+    """Serialize a value for storage in a JSON text column"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC).decode()
+
+def _compile_row_converter(model) -> tuple:
+    """
+    Build the pieces of a to_dict() serializer for a model class
+    
+    Returns get_values, which fetches all column values with a single
+    attrgetter call, and from_values, which turns those values into a dict
+    with only the DateTime columns converted to ISO strings.
+    """
+    columns = list(model.__table__.columns)
+    keys = tuple(column.key for column in columns)
+    datetime_indexes = tuple(i for i, column in enumerate(columns) if isinstance(column.type, DateTime))
+    get_values = operator.attrgetter(*keys)
+    
+    def from_values(values: tuple) -> Dict[str, Any]:
+        data = dict(zip(keys, values))
+        for i in datetime_indexes:
+            value = values[i]
+            data[keys[i]] = value.isoformat() if value else None
+        return data
+    
+    return get_values, from_values
+
+def _compile_to_dict(model) -> Callable[[Any], Dict[str, Any]]:
+    """
+    Build a to_dict() serializer for a model class
+    
+    All column values are fetched with a single attrgetter call and only the
+    DateTime columns are converted to ISO strings, instead of looking up each
+    attribute by hand on every call.
+    """
+    get_values, from_values = _compile_row_converter(model)
+    
+    def to_dict(instance) -> Dict[str, Any]:
+        return from_values(get_values(instance))
+    
+    return to_dict
 
 class Session(Base):
     """Session table - core session management"""
     __tablename__ = 'sessions'
     
-    id = Column(String, primary_key=True)  # session_timestamp_id format
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    status = Column(String, default='created')  # created, configured, running, completed, failed
-    network_id = Column(String)
-    network_name = Column(String)
-    session_path = Column(String)
-    can_analyze = Column(Boolean, default=False)
-    completed_at = Column(DateTime, nullable=True)
+    id: Mapped[str] = mapped_column(String, primary_key=True)  # session_timestamp_id format
+    # Client-side defaults populate new instances without a read-back SELECT
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow, server_default=func.now(), index=True)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow, server_default=func.now(), onupdate=func.now())
+    status: Mapped[Optional[str]] = mapped_column(
+        Enum('created', 'configured', 'network_configured', 'running', 'completed', 'failed', 'expired',
+             name='session_status', validate_strings=True),
+        default='created', index=True
+    )
+    network_id: Mapped[Optional[str]] = mapped_column(String)
+    network_name: Mapped[Optional[str]] = mapped_column(String)
+    session_path: Mapped[Optional[str]] = mapped_column(String)
+    can_analyze: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
     # Multi-session support fields
-    traci_port = Column(Integer, nullable=True)  # TraCI port for this session
-    process_id = Column(Integer, nullable=True)  # SUMO process ID
-    launched_at = Column(DateTime, nullable=True)  # When simulation was launched
-    enable_gui = Column(Boolean, default=True)  # Whether GUI is enabled
-    is_active = Column(Boolean, default=False)  # Whether session is currently active
-    temp_directory = Column(String, nullable=True)  # Temporary session directory
+    traci_port: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # TraCI port for this session
+    process_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # SUMO process ID
+    launched_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # When simulation was launched
+    enable_gui: Mapped[Optional[bool]] = mapped_column(Boolean, default=True)  # Whether GUI is enabled
+    is_active: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)  # Whether session is currently active
+    temp_directory: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # Temporary session directory
     
     # Relationships
-    configuration = relationship("Configuration", back_populates="session", uselist=False)
-    live_data = relationship("LiveData", back_populates="session")
-    kpis = relationship("KPI", back_populates="session", uselist=False)
-    trips = relationship("Trip", back_populates="session")
-    time_series = relationship("TimeSeries", back_populates="session")
-    recommendations = relationship("Recommendation", back_populates="session")
+    # Collections are lazy="raise": load them explicitly with selectinload()
+    # rather than letting an attribute access issue a query per session
+    configuration: Mapped[Optional["Configuration"]] = relationship("Configuration", back_populates="session", passive_deletes=True, uselist=False)
+    live_data: Mapped[List["LiveData"]] = relationship("LiveData", back_populates="session", passive_deletes=True, lazy="raise")
+    kpis: Mapped[Optional["KPI"]] = relationship("KPI", back_populates="session", passive_deletes=True, uselist=False)
+    trips: Mapped[List["Trip"]] = relationship("Trip", back_populates="session", passive_deletes=True, lazy="raise")
+    time_series: Mapped[List["TimeSeries"]] = relationship("TimeSeries", back_populates="session", passive_deletes=True, lazy="raise")
+    recommendations: Mapped[List["Recommendation"]] = relationship("Recommendation", back_populates="session", passive_deletes=True, lazy="raise")
     
     # New analytics relationships
-    vehicle_emissions = relationship("VehicleEmissions", back_populates="session")
-    edge_data = relationship("EdgeData", back_populates="session")
-    safety_metrics = relationship("SafetyMetrics", back_populates="session", uselist=False)
-    route_analysis = relationship("RouteAnalysis", back_populates="session", uselist=False)
-    temporal_patterns = relationship("TemporalPatterns", back_populates="session", uselist=False)
+    vehicle_emissions: Mapped[List["VehicleEmissions"]] = relationship("VehicleEmissions", back_populates="session", passive_deletes=True, lazy="raise")
+    edge_data: Mapped[List["EdgeData"]] = relationship("EdgeData", back_populates="session", passive_deletes=True, lazy="raise")
+    safety_metrics: Mapped[Optional["SafetyMetrics"]] = relationship("SafetyMetrics", back_populates="session", passive_deletes=True, uselist=False)
+    route_analysis: Mapped[Optional["RouteAnalysis"]] = relationship("RouteAnalysis", back_populates="session", passive_deletes=True, uselist=False)
+    temporal_patterns: Mapped[Optional["TemporalPatterns"]] = relationship("TemporalPatterns", back_populates="session", passive_deletes=True, uselist=False)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert session to dictionary"""
-        return {
-            'id': self.id,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'status': self.status,
-            'network_id': self.network_id,
-            'network_name': self.network_name,
-            'session_path': self.session_path,
-            'can_analyze': self.can_analyze,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'traci_port': self.traci_port,
-            'process_id': self.process_id,
-            'launched_at': self.launched_at.isoformat() if self.launched_at else None,
-            'enable_gui': self.enable_gui,
-            'is_active': self.is_active,
-            'temp_directory': self.temp_directory
-        }
+        values = _session_values(self)
+        if self.status in _FINISHED_SESSION_STATUSES:
+            # Finished rows no longer change, so their dicts are memoized by value
+            return dict(_finished_session_dict(values))
+        return _session_from_values(values)
+
+_session_values, _session_from_values = _compile_row_converter(Session)
+_finished_session_dict = functools.lru_cache(maxsize=4096)(_session_from_values)
+
+# Statuses after which a session row is no longer updated
+_FINISHED_SESSION_STATUSES = frozenset(['completed', 'failed', 'expired'])
 
 class Configuration(Base):
     """Configuration table - user settings per session"""
     __tablename__ = 'configurations'
     
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, ForeignKey('sessions.id'))
-    sumo_begin = Column(Integer)
-    sumo_end = Column(Integer)
-    sumo_step_length = Column(Float)
-    sumo_time_to_teleport = Column(Integer)
-    sumo_traffic_intensity = Column(Float)
-    enabled_vehicles = Column(Text)  # JSON array
-    traffic_control_method = Column(String)
-    traffic_control_config = Column(Text)  # JSON object
-    vehicle_types_config = Column(Text)  # JSON object
-    speed_limits = Column(Text)  # JSON array
-    road_closures = Column(Text)  # JSON array
-    created_at = Column(DateTime, default=datetime.utcnow)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey('sessions.id', ondelete='CASCADE'), unique=True)
+    sumo_begin: Mapped[Optional[int]] = mapped_column(Integer)
+    sumo_end: Mapped[Optional[int]] = mapped_column(Integer)
+    sumo_step_length: Mapped[Optional[float]] = mapped_column(Float)
+    sumo_time_to_teleport: Mapped[Optional[int]] = mapped_column(Integer)
+    sumo_traffic_intensity: Mapped[Optional[float]] = mapped_column(Float)
+    enabled_vehicles: Mapped[Optional[str]] = mapped_column(Text)  # JSON array
+    traffic_control_method: Mapped[Optional[str]] = mapped_column(String)
+    traffic_control_config: Mapped[Optional[str]] = mapped_column(Text)  # JSON object
+    vehicle_types_config: Mapped[Optional[str]] = mapped_column(Text)  # JSON object
+    speed_limits: Mapped[Optional[str]] = mapped_column(Text)  # JSON array
+    road_closures: Mapped[Optional[str]] = mapped_column(Text)  # JSON array
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
     
     # Relationships
-    session = relationship("Session", back_populates="configuration")
+    session: Mapped[Optional["Session"]] = relationship("Session", back_populates="configuration")
     
     def get_enabled_vehicles(self) -> List[str]:
         """Get enabled vehicles as list"""
-        return json.loads(self.enabled_vehicles) if self.enabled_vehicles else []
+        return orjson.loads(self.enabled_vehicles) if self.enabled_vehicles else []
     
     def set_enabled_vehicles(self, vehicles: List[str]):
         """Set enabled vehicles from list"""
-        self.enabled_vehicles = json.dumps(vehicles)
+        self.enabled_vehicles = _dumps(vehicles)
     
     def get_traffic_control_config(self) -> Dict[str, Any]:
         """Get traffic control config as dict"""
-        return json.loads(self.traffic_control_config) if self.traffic_control_config else {}
+        return orjson.loads(self.traffic_control_config) if self.traffic_control_config else {}
     
     def set_traffic_control_config(self, config: Dict[str, Any]):
         """Set traffic control config from dict"""
-        self.traffic_control_config = json.dumps(config)
+        self.traffic_control_config = _dumps(config)
     
     def get_vehicle_types_config(self) -> Dict[str, Any]:
         """Get vehicle types config as dict"""
-        return json.loads(self.vehicle_types_config) if self.vehicle_types_config else {}
+        return orjson.loads(self.vehicle_types_config) if self.vehicle_types_config else {}
     
     def set_vehicle_types_config(self, config: Dict[str, Any]):
         """Set vehicle types config from dict"""
-        self.vehicle_types_config = json.dumps(config)
+        self.vehicle_types_config = _dumps(config)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert configuration to dictionary"""
@@ -141,419 +186,362 @@ class LiveData(Base):
     """Live simulation data - real-time metrics"""
     __tablename__ = 'live_data'
     
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, ForeignKey('sessions.id'))
-    simulation_time = Column(Integer)
-    active_vehicles = Column(Integer)
-    avg_speed = Column(Float)
-    throughput = Column(Float)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    raw_data = Column(Text)  # JSON for additional metrics
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey('sessions.id', ondelete='CASCADE'))
+    simulation_time: Mapped[Optional[int]] = mapped_column(Integer)
+    active_vehicles: Mapped[Optional[int]] = mapped_column(Integer)
+    avg_speed: Mapped[Optional[float]] = mapped_column(Float)
+    throughput: Mapped[Optional[float]] = mapped_column(Float)
+    timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
+    raw_data: Mapped[Optional[str]] = mapped_column(Text)  # JSON for additional metrics
     
     # Relationships
-    session = relationship("Session", back_populates="live_data")
+    session: Mapped[Optional["Session"]] = relationship("Session", back_populates="live_data")
     
     def get_raw_data(self) -> Dict[str, Any]:
         """Get raw data as dict"""
-        return json.loads(self.raw_data) if self.raw_data else {}
+        return orjson.loads(self.raw_data) if self.raw_data else {}
     
     def set_raw_data(self, data: Dict[str, Any]):
         """Set raw data from dict"""
-        self.raw_data = json.dumps(data)
+        self.raw_data = _dumps(data)
+
+# get_live_data reads a session's newest rows first
+Index('ix_live_data_session_id_timestamp', LiveData.session_id, LiveData.timestamp.desc())
 
 class KPI(Base):
     """KPIs table - post-simulation analytics"""
     __tablename__ = 'kpis'
     
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, ForeignKey('sessions.id'))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey('sessions.id', ondelete='CASCADE'), unique=True)
     
     # Core traffic metrics
-    total_vehicles_loaded = Column(Integer)
-    total_vehicles_completed = Column(Integer)
-    total_vehicles_running = Column(Integer)
-    total_vehicles_waiting = Column(Integer)
-    avg_travel_time = Column(Float)
-    max_travel_time = Column(Float)
-    avg_waiting_time = Column(Float)
-    max_waiting_time = Column(Float)
-    avg_speed = Column(Float)
-    avg_relative_speed = Column(Float)
-    avg_route_length = Column(Float)
-    total_distance_traveled = Column(Float)
-    avg_density = Column(Float)
-    max_density = Column(Float)
-    congestion_index = Column(Float)
-    throughput = Column(Float)
-    flow_rate = Column(Float)
-    avg_time_loss = Column(Float)
-    total_teleports = Column(Integer)
-    total_collisions = Column(Integer)
-    simulation_duration = Column(Float)
+    total_vehicles_loaded: Mapped[Optional[int]] = mapped_column(Integer)
+    total_vehicles_completed: Mapped[Optional[int]] = mapped_column(Integer)
+    total_vehicles_running: Mapped[Optional[int]] = mapped_column(Integer)
+    total_vehicles_waiting: Mapped[Optional[int]] = mapped_column(Integer)
+    avg_travel_time: Mapped[Optional[float]] = mapped_column(Float)
+    max_travel_time: Mapped[Optional[float]] = mapped_column(Float)
+    avg_waiting_time: Mapped[Optional[float]] = mapped_column(Float)
+    max_waiting_time: Mapped[Optional[float]] = mapped_column(Float)
+    avg_speed: Mapped[Optional[float]] = mapped_column(Float)
+    avg_relative_speed: Mapped[Optional[float]] = mapped_column(Float)
+    avg_route_length: Mapped[Optional[float]] = mapped_column(Float)
+    total_distance_traveled: Mapped[Optional[float]] = mapped_column(Float)
+    avg_density: Mapped[Optional[float]] = mapped_column(Float)
+    max_density: Mapped[Optional[float]] = mapped_column(Float)
+    congestion_index: Mapped[Optional[float]] = mapped_column(Float)
+    throughput: Mapped[Optional[float]] = mapped_column(Float)
+    flow_rate: Mapped[Optional[float]] = mapped_column(Float)
+    avg_time_loss: Mapped[Optional[float]] = mapped_column(Float)
+    total_teleports: Mapped[Optional[int]] = mapped_column(Integer)
+    total_collisions: Mapped[Optional[int]] = mapped_column(Integer)
+    simulation_duration: Mapped[Optional[float]] = mapped_column(Float)
     
     # Environmental metrics
-    total_co2 = Column(Float)
-    total_co = Column(Float)
-    total_nox = Column(Float)
-    total_hc = Column(Float)
-    total_pmx = Column(Float)
-    total_fuel_consumption = Column(Float)
-    total_energy_consumption = Column(Float)
-    avg_co2_per_km = Column(Float)
-    avg_fuel_per_km = Column(Float)
+    total_co2: Mapped[Optional[float]] = mapped_column(Float)
+    total_co: Mapped[Optional[float]] = mapped_column(Float)
+    total_nox: Mapped[Optional[float]] = mapped_column(Float)
+    total_hc: Mapped[Optional[float]] = mapped_column(Float)
+    total_pmx: Mapped[Optional[float]] = mapped_column(Float)
+    total_fuel_consumption: Mapped[Optional[float]] = mapped_column(Float)
+    total_energy_consumption: Mapped[Optional[float]] = mapped_column(Float)
+    avg_co2_per_km: Mapped[Optional[float]] = mapped_column(Float)
+    avg_fuel_per_km: Mapped[Optional[float]] = mapped_column(Float)
     
     # Network metrics
-    avg_edge_occupancy = Column(Float)
-    max_edge_occupancy = Column(Float)
-    avg_edge_density = Column(Float)
-    total_entered_vehicles = Column(Integer)
-    total_left_vehicles = Column(Integer)
-    avg_traveltime = Column(Float)
-    avg_waiting_time_per_edge = Column(Float)
-    network_efficiency_index = Column(Float)
-    edge_utilization_variance = Column(Float)
+    avg_edge_occupancy: Mapped[Optional[float]] = mapped_column(Float)
+    max_edge_occupancy: Mapped[Optional[float]] = mapped_column(Float)
+    avg_edge_density: Mapped[Optional[float]] = mapped_column(Float)
+    total_entered_vehicles: Mapped[Optional[int]] = mapped_column(Integer)
+    total_left_vehicles: Mapped[Optional[int]] = mapped_column(Integer)
+    avg_traveltime: Mapped[Optional[float]] = mapped_column(Float)
+    avg_waiting_time_per_edge: Mapped[Optional[float]] = mapped_column(Float)
+    network_efficiency_index: Mapped[Optional[float]] = mapped_column(Float)
+    edge_utilization_variance: Mapped[Optional[float]] = mapped_column(Float)
     
     # Safety metrics
-    composite_safety_score = Column(Float)
-    collision_density = Column(Float)
-    teleport_density = Column(Float)
-    avg_emergency_stops = Column(Float)
-    high_deceleration_events = Column(Integer)
-    lane_change_frequency = Column(Float)
-    intersection_conflicts = Column(Integer)
-    critical_gap_violations = Column(Integer)
+    composite_safety_score: Mapped[Optional[float]] = mapped_column(Float)
+    collision_density: Mapped[Optional[float]] = mapped_column(Float)
+    teleport_density: Mapped[Optional[float]] = mapped_column(Float)
+    avg_emergency_stops: Mapped[Optional[float]] = mapped_column(Float)
+    high_deceleration_events: Mapped[Optional[int]] = mapped_column(Integer)
+    lane_change_frequency: Mapped[Optional[float]] = mapped_column(Float)
+    intersection_conflicts: Mapped[Optional[int]] = mapped_column(Integer)
+    critical_gap_violations: Mapped[Optional[int]] = mapped_column(Integer)
     
     # Quality scores
-    environmental_score = Column(Float)
-    efficiency_score = Column(Float)
-    safety_score = Column(Float)
-    overall_performance_score = Column(Float)
+    environmental_score: Mapped[Optional[float]] = mapped_column(Float)
+    efficiency_score: Mapped[Optional[float]] = mapped_column(Float)
+    safety_score: Mapped[Optional[float]] = mapped_column(Float)
+    overall_performance_score: Mapped[Optional[float]] = mapped_column(Float)
     
     # Metadata
-    notes = Column(Text)
-    analysis_timestamp = Column(DateTime, default=datetime.utcnow)
+    notes: Mapped[Optional[str]] = mapped_column(Text)
+    analysis_timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
     
     # Relationships
-    session = relationship("Session", back_populates="kpis")
+    session: Mapped[Optional["Session"]] = relationship("Session", back_populates="kpis")
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert KPIs to dictionary"""
-        return {
-            'id': self.id,
-            'session_id': self.session_id,
-            
-            # Core traffic metrics
-            'total_vehicles_loaded': self.total_vehicles_loaded,
-            'total_vehicles_completed': self.total_vehicles_completed,
-            'total_vehicles_running': self.total_vehicles_running,
-            'total_vehicles_waiting': self.total_vehicles_waiting,
-            'avg_travel_time': self.avg_travel_time,
-            'max_travel_time': self.max_travel_time,
-            'avg_waiting_time': self.avg_waiting_time,
-            'max_waiting_time': self.max_waiting_time,
-            'avg_speed': self.avg_speed,
-            'avg_relative_speed': self.avg_relative_speed,
-            'avg_route_length': self.avg_route_length,
-            'total_distance_traveled': self.total_distance_traveled,
-            'avg_density': self.avg_density,
-            'max_density': self.max_density,
-            'congestion_index': self.congestion_index,
-            'throughput': self.throughput,
-            'flow_rate': self.flow_rate,
-            'avg_time_loss': self.avg_time_loss,
-            'total_teleports': self.total_teleports,
-            'total_collisions': self.total_collisions,
-            'simulation_duration': self.simulation_duration,
-            
-            # Environmental metrics
-            'total_co2': self.total_co2,
-            'total_co': self.total_co,
-            'total_nox': self.total_nox,
-            'total_hc': self.total_hc,
-            'total_pmx': self.total_pmx,
-            'total_fuel_consumption': self.total_fuel_consumption,
-            'total_energy_consumption': self.total_energy_consumption,
-            'avg_co2_per_km': self.avg_co2_per_km,
-            'avg_fuel_per_km': self.avg_fuel_per_km,
-            
-            # Network metrics
-            'avg_edge_occupancy': self.avg_edge_occupancy,
-            'max_edge_occupancy': self.max_edge_occupancy,
-            'avg_edge_density': self.avg_edge_density,
-            'total_entered_vehicles': self.total_entered_vehicles,
-            'total_left_vehicles': self.total_left_vehicles,
-            'avg_traveltime': self.avg_traveltime,
-            'avg_waiting_time_per_edge': self.avg_waiting_time_per_edge,
-            'network_efficiency_index': self.network_efficiency_index,
-            'edge_utilization_variance': self.edge_utilization_variance,
-            
-            # Safety metrics
-            'composite_safety_score': self.composite_safety_score,
-            'collision_density': self.collision_density,
-            'teleport_density': self.teleport_density,
-            'avg_emergency_stops': self.avg_emergency_stops,
-            'high_deceleration_events': self.high_deceleration_events,
-            'lane_change_frequency': self.lane_change_frequency,
-            'intersection_conflicts': self.intersection_conflicts,
-            'critical_gap_violations': self.critical_gap_violations,
-            
-            # Quality scores
-            'environmental_score': self.environmental_score,
-            'efficiency_score': self.efficiency_score,
-            'safety_score': self.safety_score,
-            'overall_performance_score': self.overall_performance_score,
-            
-            # Metadata
-            'notes': self.notes,
-            'analysis_timestamp': self.analysis_timestamp.isoformat() if self.analysis_timestamp else None
-        }
+        return _kpi_to_dict(self)
+
+_kpi_to_dict = _compile_to_dict(KPI)
 
 class Trip(Base):
     """Individual trip data - detailed vehicle information"""
     __tablename__ = 'trips'
     
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, ForeignKey('sessions.id'))
-    vehicle_id = Column(String)
-    vehicle_type = Column(String)
-    depart_time = Column(Float)
-    arrival_time = Column(Float)
-    duration = Column(Float)
-    route_length = Column(Float)
-    waiting_time = Column(Float)
-    time_loss = Column(Float)
-    avg_speed = Column(Float)
-    depart_speed = Column(Float)
-    arrival_speed = Column(Float)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey('sessions.id', ondelete='CASCADE'), index=True)
+    vehicle_id: Mapped[Optional[str]] = mapped_column(String)
+    vehicle_type: Mapped[Optional[str]] = mapped_column(String, index=True)  # Free-form SUMO vType id
+    depart_time: Mapped[Optional[float]] = mapped_column(Float)
+    arrival_time: Mapped[Optional[float]] = mapped_column(Float)
+    duration: Mapped[Optional[float]] = mapped_column(Float)
+    route_length: Mapped[Optional[float]] = mapped_column(Float)
+    waiting_time: Mapped[Optional[float]] = mapped_column(Float)
+    time_loss: Mapped[Optional[float]] = mapped_column(Float)
+    avg_speed: Mapped[Optional[float]] = mapped_column(Float)
+    depart_speed: Mapped[Optional[float]] = mapped_column(Float)
+    arrival_speed: Mapped[Optional[float]] = mapped_column(Float)
     
     # Relationships
-    session = relationship("Session", back_populates="trips")
+    session: Mapped[Optional["Session"]] = relationship("Session", back_populates="trips")
 
 class TimeSeries(Base):
     """Time series data - for trend analysis"""
     __tablename__ = 'time_series'
     
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, ForeignKey('sessions.id'))
-    time_step = Column(Float)
-    running_vehicles = Column(Integer)
-    halting_vehicles = Column(Integer)
-    mean_speed = Column(Float)
-    mean_waiting_time = Column(Float)
-    teleports = Column(Integer)
-    collisions = Column(Integer)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey('sessions.id', ondelete='CASCADE'), index=True)
+    time_step: Mapped[Optional[float]] = mapped_column(Float)
+    running_vehicles: Mapped[Optional[int]] = mapped_column(Integer)
+    halting_vehicles: Mapped[Optional[int]] = mapped_column(Integer)
+    mean_speed: Mapped[Optional[float]] = mapped_column(Float)
+    mean_waiting_time: Mapped[Optional[float]] = mapped_column(Float)
+    teleports: Mapped[Optional[int]] = mapped_column(Integer)
+    collisions: Mapped[Optional[int]] = mapped_column(Integer)
     
     # Relationships
-    session = relationship("Session", back_populates="time_series")
+    session: Mapped[Optional["Session"]] = relationship("Session", back_populates="time_series")
 
 class Recommendation(Base):
     """Recommendations - AI/rule-based suggestions"""
     __tablename__ = 'recommendations'
     
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, ForeignKey('sessions.id'))
-    rule_id = Column(String)
-    priority = Column(String)
-    category = Column(String)
-    message = Column(Text)
-    kpi_name = Column(String)
-    actual_value = Column(Float)
-    threshold_value = Column(Float)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey('sessions.id', ondelete='CASCADE'), index=True)
+    rule_id: Mapped[Optional[str]] = mapped_column(String)
+    priority: Mapped[Optional[str]] = mapped_column(
+        Enum('high', 'medium', 'low', name='recommendation_priority', validate_strings=True), index=True
+    )
+    category: Mapped[Optional[str]] = mapped_column(
+        Enum('congestion', 'safety', 'efficiency', 'environmental', 'general',
+             name='recommendation_category', validate_strings=True),
+        index=True
+    )
+    message: Mapped[Optional[str]] = mapped_column(Text)
+    kpi_name: Mapped[Optional[str]] = mapped_column(String)
+    actual_value: Mapped[Optional[float]] = mapped_column(Float)
+    threshold_value: Mapped[Optional[float]] = mapped_column(Float)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
     
     # Relationships
-    session = relationship("Session", back_populates="recommendations")
+    session: Mapped[Optional["Session"]] = relationship("Session", back_populates="recommendations")
 
 class VehicleEmissions(Base):
     """Vehicle emissions data - detailed environmental metrics"""
     __tablename__ = 'vehicle_emissions'
     
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, ForeignKey('sessions.id'))
-    vehicle_id = Column(String)
-    vehicle_type = Column(String)
-    co2_emissions = Column(Float)
-    co_emissions = Column(Float)
-    hc_emissions = Column(Float)
-    nox_emissions = Column(Float)
-    pmx_emissions = Column(Float)
-    fuel_consumption = Column(Float)
-    energy_consumption = Column(Float)
-    distance_traveled = Column(Float)
-    travel_time = Column(Float)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey('sessions.id', ondelete='CASCADE'), index=True)
+    vehicle_id: Mapped[Optional[str]] = mapped_column(String)
+    vehicle_type: Mapped[Optional[str]] = mapped_column(String)
+    co2_emissions: Mapped[Optional[float]] = mapped_column(Float)
+    co_emissions: Mapped[Optional[float]] = mapped_column(Float)
+    hc_emissions: Mapped[Optional[float]] = mapped_column(Float)
+    nox_emissions: Mapped[Optional[float]] = mapped_column(Float)
+    pmx_emissions: Mapped[Optional[float]] = mapped_column(Float)
+    fuel_consumption: Mapped[Optional[float]] = mapped_column(Float)
+    energy_consumption: Mapped[Optional[float]] = mapped_column(Float)
+    distance_traveled: Mapped[Optional[float]] = mapped_column(Float)
+    travel_time: Mapped[Optional[float]] = mapped_column(Float)
     
     # Relationships
-    session = relationship("Session", back_populates="vehicle_emissions")
+    session: Mapped[Optional["Session"]] = relationship("Session", back_populates="vehicle_emissions")
 
 class EdgeData(Base):
     """Edge/road segment performance data"""
     __tablename__ = 'edge_data'
     
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, ForeignKey('sessions.id'))
-    edge_id = Column(String)
-    time_interval_begin = Column(Float)
-    time_interval_end = Column(Float)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey('sessions.id', ondelete='CASCADE'), index=True)
+    edge_id: Mapped[Optional[str]] = mapped_column(String)
+    time_interval_begin: Mapped[Optional[float]] = mapped_column(Float)
+    time_interval_end: Mapped[Optional[float]] = mapped_column(Float)
     
     # Traffic metrics
-    entered_vehicles = Column(Integer)
-    left_vehicles = Column(Integer)
-    vehicle_sum = Column(Integer)
-    occupancy = Column(Float)
-    mean_speed = Column(Float)
-    density = Column(Float)
-    travel_time = Column(Float)
-    waiting_time = Column(Float)
+    entered_vehicles: Mapped[Optional[int]] = mapped_column(Integer)
+    left_vehicles: Mapped[Optional[int]] = mapped_column(Integer)
+    vehicle_sum: Mapped[Optional[int]] = mapped_column(Integer)
+    occupancy: Mapped[Optional[float]] = mapped_column(Float)
+    mean_speed: Mapped[Optional[float]] = mapped_column(Float)
+    density: Mapped[Optional[float]] = mapped_column(Float)
+    travel_time: Mapped[Optional[float]] = mapped_column(Float)
+    waiting_time: Mapped[Optional[float]] = mapped_column(Float)
     
     # Safety metrics
-    emergency_stops = Column(Integer)
-    high_decel_events = Column(Integer)
+    emergency_stops: Mapped[Optional[int]] = mapped_column(Integer)
+    high_decel_events: Mapped[Optional[int]] = mapped_column(Integer)
     
     # Relationships
-    session = relationship("Session", back_populates="edge_data")
+    session: Mapped[Optional["Session"]] = relationship("Session", back_populates="edge_data")
 
 class SafetyMetrics(Base):
     """Detailed safety analysis data"""
     __tablename__ = 'safety_metrics'
     
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, ForeignKey('sessions.id'))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey('sessions.id', ondelete='CASCADE'), unique=True)
     
     # Trip-based safety indicators
-    total_emergency_stops = Column(Integer)
-    total_high_decel_events = Column(Integer)
-    total_lane_changes = Column(Integer)
-    avg_deceleration = Column(Float)
-    max_deceleration = Column(Float)
+    total_emergency_stops: Mapped[Optional[int]] = mapped_column(Integer)
+    total_high_decel_events: Mapped[Optional[int]] = mapped_column(Integer)
+    total_lane_changes: Mapped[Optional[int]] = mapped_column(Integer)
+    avg_deceleration: Mapped[Optional[float]] = mapped_column(Float)
+    max_deceleration: Mapped[Optional[float]] = mapped_column(Float)
     
     # Time-based analysis
-    critical_periods = Column(Text)  # JSON array of high-risk time periods
-    peak_collision_times = Column(Text)  # JSON array
+    critical_periods: Mapped[Optional[str]] = mapped_column(Text)  # JSON array of high-risk time periods
+    peak_collision_times: Mapped[Optional[str]] = mapped_column(Text)  # JSON array
     
     # Spatial analysis
-    high_risk_edges = Column(Text)  # JSON array of edge IDs with safety issues
-    intersection_hotspots = Column(Text)  # JSON array of problematic intersections
+    high_risk_edges: Mapped[Optional[str]] = mapped_column(Text)  # JSON array of edge IDs with safety issues
+    intersection_hotspots: Mapped[Optional[str]] = mapped_column(Text)  # JSON array of problematic intersections
     
     # Risk scores
-    collision_risk_score = Column(Float)
-    congestion_safety_impact = Column(Float)
-    speed_variance_risk = Column(Float)
+    collision_risk_score: Mapped[Optional[float]] = mapped_column(Float)
+    congestion_safety_impact: Mapped[Optional[float]] = mapped_column(Float)
+    speed_variance_risk: Mapped[Optional[float]] = mapped_column(Float)
     
     # Analysis metadata
-    analysis_timestamp = Column(DateTime, default=datetime.utcnow)
+    analysis_timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
     
     # Relationships
-    session = relationship("Session", back_populates="safety_metrics")
+    session: Mapped[Optional["Session"]] = relationship("Session", back_populates="safety_metrics")
     
     def get_critical_periods(self) -> List[Dict[str, Any]]:
         """Get critical periods as list of dicts"""
-        return json.loads(self.critical_periods) if self.critical_periods else []
+        return orjson.loads(self.critical_periods) if self.critical_periods else []
     
     def set_critical_periods(self, periods: List[Dict[str, Any]]):
         """Set critical periods from list"""
-        self.critical_periods = json.dumps(periods)
+        self.critical_periods = _dumps(periods)
     
     def get_high_risk_edges(self) -> List[str]:
         """Get high risk edges as list"""
-        return json.loads(self.high_risk_edges) if self.high_risk_edges else []
+        return orjson.loads(self.high_risk_edges) if self.high_risk_edges else []
     
     def set_high_risk_edges(self, edges: List[str]):
         """Set high risk edges from list"""
-        self.high_risk_edges = json.dumps(edges)
+        self.high_risk_edges = _dumps(edges)
 
 class RouteAnalysis(Base):
     """Route performance and pattern analysis"""
     __tablename__ = 'route_analysis'
     
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, ForeignKey('sessions.id'))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey('sessions.id', ondelete='CASCADE'), unique=True)
     
     # Route diversity metrics
-    total_unique_routes = Column(Integer)
-    avg_route_overlap = Column(Float)
-    route_diversity_index = Column(Float)
+    total_unique_routes: Mapped[Optional[int]] = mapped_column(Integer)
+    avg_route_overlap: Mapped[Optional[float]] = mapped_column(Float)
+    route_diversity_index: Mapped[Optional[float]] = mapped_column(Float)
     
     # Popular routes
-    most_used_routes = Column(Text)  # JSON array with route data
-    route_usage_distribution = Column(Text)  # JSON object
+    most_used_routes: Mapped[Optional[str]] = mapped_column(Text)  # JSON array with route data
+    route_usage_distribution: Mapped[Optional[str]] = mapped_column(Text)  # JSON object
     
     # Route efficiency
-    avg_route_efficiency = Column(Float)
-    route_time_variance = Column(Float)
-    alternative_route_usage = Column(Float)
+    avg_route_efficiency: Mapped[Optional[float]] = mapped_column(Float)
+    route_time_variance: Mapped[Optional[float]] = mapped_column(Float)
+    alternative_route_usage: Mapped[Optional[float]] = mapped_column(Float)
     
     # Analysis metadata
-    analysis_timestamp = Column(DateTime, default=datetime.utcnow)
+    analysis_timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
     
     # Relationships
-    session = relationship("Session", back_populates="route_analysis")
+    session: Mapped[Optional["Session"]] = relationship("Session", back_populates="route_analysis")
     
     def get_most_used_routes(self) -> List[Dict[str, Any]]:
         """Get most used routes as list"""
-        return json.loads(self.most_used_routes) if self.most_used_routes else []
+        return orjson.loads(self.most_used_routes) if self.most_used_routes else []
     
     def set_most_used_routes(self, routes: List[Dict[str, Any]]):
         """Set most used routes from list"""
-        self.most_used_routes = json.dumps(routes)
+        self.most_used_routes = _dumps(routes)
 
 class TemporalPatterns(Base):
     """Temporal traffic pattern analysis"""
     __tablename__ = 'temporal_patterns'
     
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, ForeignKey('sessions.id'))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey('sessions.id', ondelete='CASCADE'), unique=True)
     
     # Peak analysis
-    morning_peak_start = Column(Float)
-    morning_peak_end = Column(Float)
-    evening_peak_start = Column(Float)
-    evening_peak_end = Column(Float)
-    peak_intensity_morning = Column(Float)
-    peak_intensity_evening = Column(Float)
+    morning_peak_start: Mapped[Optional[float]] = mapped_column(Float)
+    morning_peak_end: Mapped[Optional[float]] = mapped_column(Float)
+    evening_peak_start: Mapped[Optional[float]] = mapped_column(Float)
+    evening_peak_end: Mapped[Optional[float]] = mapped_column(Float)
+    peak_intensity_morning: Mapped[Optional[float]] = mapped_column(Float)
+    peak_intensity_evening: Mapped[Optional[float]] = mapped_column(Float)
     
     # Pattern metrics
-    traffic_variability_index = Column(Float)
-    congestion_persistence = Column(Float)
-    recovery_time_avg = Column(Float)
+    traffic_variability_index: Mapped[Optional[float]] = mapped_column(Float)
+    congestion_persistence: Mapped[Optional[float]] = mapped_column(Float)
+    recovery_time_avg: Mapped[Optional[float]] = mapped_column(Float)
     
     # Hourly patterns
-    hourly_flow_patterns = Column(Text)  # JSON array of hourly data
-    congestion_timeline = Column(Text)  # JSON array of congestion events
+    hourly_flow_patterns: Mapped[Optional[str]] = mapped_column(Text)  # JSON array of hourly data
+    congestion_timeline: Mapped[Optional[str]] = mapped_column(Text)  # JSON array of congestion events
     
     # Analysis metadata
-    analysis_timestamp = Column(DateTime, default=datetime.utcnow)
+    analysis_timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
     
     # Relationships
-    session = relationship("Session", back_populates="temporal_patterns")
+    session: Mapped[Optional["Session"]] = relationship("Session", back_populates="temporal_patterns")
     
     def get_hourly_patterns(self) -> List[Dict[str, Any]]:
         """Get hourly flow patterns as list"""
-        return json.loads(self.hourly_flow_patterns) if self.hourly_flow_patterns else []
+        return orjson.loads(self.hourly_flow_patterns) if self.hourly_flow_patterns else []
     
     def set_hourly_patterns(self, patterns: List[Dict[str, Any]]):
         """Set hourly flow patterns from list"""
-        self.hourly_flow_patterns = json.dumps(patterns)
+        self.hourly_flow_patterns = _dumps(patterns)
 
 class Network(Base):
     """Networks metadata - for better network management"""
     __tablename__ = 'networks'
     
-    id = Column(String, primary_key=True)
-    name = Column(String)
-    description = Column(Text)
-    path = Column(String)
-    is_osm_scenario = Column(Boolean, default=False)
-    vehicle_types = Column(Text)  # JSON array of available types
-    created_at = Column(DateTime, default=datetime.utcnow)
-    last_used = Column(DateTime, nullable=True)
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    name: Mapped[Optional[str]] = mapped_column(String)
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    path: Mapped[Optional[str]] = mapped_column(String)
+    is_osm_scenario: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    vehicle_types: Mapped[Optional[str]] = mapped_column(Text)  # JSON array of available types
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
+    last_used: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
     def get_vehicle_types(self) -> List[str]:
         """Get vehicle types as list"""
-        return json.loads(self.vehicle_types) if self.vehicle_types else []
+        return orjson.loads(self.vehicle_types) if self.vehicle_types else []
     
     def set_vehicle_types(self, types: List[str]):
         """Set vehicle types from list"""
-        self.vehicle_types = json.dumps(types)
+        self.vehicle_types = _dumps(types)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert network to dictionary"""
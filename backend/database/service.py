@@ -8,20 +8,168 @@ Author: Traffic Simulator Team
 Date: September 2025
 """
 
-from sqlalchemy import create_engine, and_, or_, func
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy import create_engine, event, and_, or_, func, select, update, delete, lambda_stmt, bindparam
+from sqlalchemy.orm import sessionmaker, scoped_session, load_only
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator, Sequence
 from datetime import datetime, timedelta
 from pathlib import Path
-import json
+from itertools import islice
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import orjson
 import os
+import queue
+import threading
+import time
 
 from .models import (
     Base, Session, Configuration, LiveData, KPI, Trip, TimeSeries, Recommendation, Network,
-    VehicleEmissions, EdgeData, SafetyMetrics, RouteAnalysis, TemporalPatterns
+    VehicleEmissions, EdgeData, SafetyMetrics, RouteAnalysis, TemporalPatterns, _dumps
 )
 
+# Rows per executemany batch in bulk saves; gains plateau well before 10k
+# rows while peak memory keeps growing with the batch
+_BULK_INSERT_CHUNK_SIZE = 5000
+
+# Session columns returned by session summaries unless the caller asks for others
+_SESSION_LIST_FIELDS = ('id', 'network_name', 'status', 'created_at', 'is_active')
+
+# Analysis columns that hold JSON-encoded lists/dicts
+_SAFETY_JSON_FIELDS = frozenset(['critical_periods', 'peak_collision_times', 'high_risk_edges', 'intersection_hotspots'])
+_ROUTE_JSON_FIELDS = frozenset(['most_used_routes', 'route_usage_distribution'])
+_TEMPORAL_JSON_FIELDS = frozenset(['hourly_flow_patterns', 'congestion_timeline'])
+
+# Column names of the analysis tables, used to drop unknown payload keys
+_ANALYSIS_COLUMNS = {
+    model: frozenset(model.__table__.c.keys())
+    for model in (RouteAnalysis, TemporalPatterns)
+}
+
+# Buffered live data is flushed once either limit is reached
+_LIVE_FLUSH_THRESHOLD = 500
+_LIVE_FLUSH_INTERVAL = 2.0  # seconds
+
+# Route/temporal analysis writes are queued and written by a background
+# thread in batches of up to _ANALYSIS_BATCH_SIZE, gathered for at most
+# _ANALYSIS_BATCH_WAIT seconds
+_ANALYSIS_QUEUE_SIZE = 1024
+_ANALYSIS_BATCH_SIZE = 64
+_ANALYSIS_BATCH_WAIT = 0.05  # seconds
+
+# Threads used to read network directories; the scan is bound on file I/O
+_NETWORK_SCAN_WORKERS = 8
+
+# Seconds a get_database_stats() result stays fresh
+_STATS_TTL = 5.0
+
+# Hot single-row lookups; lambda_stmt caches each statement's construction
+# and compiled SQL, so repeat calls only bind new parameters
+_SESSION_BY_ID = lambda_stmt(lambda: select(Session).where(Session.id == bindparam('id')))
+_CONFIGURATION_BY_SESSION = lambda_stmt(
+    lambda: select(Configuration).where(Configuration.session_id == bindparam('session_id'))
+)
+_KPI_BY_SESSION = lambda_stmt(lambda: select(KPI).where(KPI.session_id == bindparam('session_id')))
+
+def _chunks(iterable, size: int) -> Iterator[list]:
+    """Yield successive lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def _json_ready(row) -> Dict[str, Any]:
+    """Copy a row mapping into a dict with datetimes as ISO strings"""
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+def _configuration_values(config_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a session config payload onto configurations columns"""
+    config = config_data.get('config', {})
+    return {
+        'sumo_begin': config.get('sumo_begin'),
+        'sumo_end': config.get('sumo_end'),
+        'sumo_step_length': config.get('sumo_step_length'),
+        'sumo_time_to_teleport': config.get('sumo_time_to_teleport'),
+        'sumo_traffic_intensity': config.get('sumo_traffic_intensity'),
+        'enabled_vehicles': _dumps(config.get('enabledVehicles', [])),
+        'traffic_control_method': config.get('trafficControl', {}).get('method'),
+        'traffic_control_config': _dumps(config.get('trafficControl', {})),
+        'vehicle_types_config': _dumps(config.get('vehicleTypes', {}))
+    }
+
+def _analysis_values(model, data: Dict[str, Any], json_fields: frozenset) -> Dict[str, Any]:
+    """Keep the keys of data that are model columns, JSON-encoding json_fields"""
+    return {
+        key: (_dumps(data[key]) if data[key] else None) if key in json_fields else data[key]
+        for key in data.keys() & _ANALYSIS_COLUMNS[model]
+    }
+
+def _read_network_dir(network_dir: Path) -> Dict[str, Any]:
+    """Build a networks row from a network directory and its metadata.json"""
+    network_id = network_dir.name
+    
+    # Find network files
+    net_files = list(network_dir.glob("*.net.xml"))
+    
+    # Read metadata if available
+    description = None
+    is_osm_scenario = False
+    vehicle_types = []
+    
+    try:
+        metadata = orjson.loads((network_dir / "metadata.json").read_bytes())
+        description = metadata.get('description', '')
+        is_osm_scenario = metadata.get('is_osm_scenario', False)
+        vehicle_types = metadata.get('vehicle_types', [])
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Could not read metadata for {network_id}: {e}")
+    
+    return {
+        'id': network_id,
+        'name': network_id.replace('_', ' ').title(),
+        'description': description or f"Network: {network_id}",
+        'path': str(net_files[0]) if net_files else str(network_dir),
+        'is_osm_scenario': is_osm_scenario,
+        'vehicle_types': _dumps(vehicle_types)
+    }
+
+def _has_unique_index(connection, table_name: str, column: str) -> bool:
+    """Whether table_name has a full UNIQUE index on exactly column"""
+    for _, index_name, unique, _, partial in connection.exec_driver_sql(f'PRAGMA index_list("{table_name}")'):
+        if unique and not partial:
+            columns = [info[2] for info in connection.exec_driver_sql(f'PRAGMA index_info("{index_name}")')]
+            if columns == [column]:
+                return True
+    return False
+
+def _cascades_session_delete(connection, table_name: str) -> bool:
+    """Whether every foreign key from table_name to sessions is ON DELETE CASCADE"""
+    return all(
+        row[6].upper() == 'CASCADE'
+        for row in connection.exec_driver_sql(f'PRAGMA foreign_key_list("{table_name}")')
+        if row[2] == Session.__tablename__
+    )
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune each new SQLite connection
+    
+    WAL journaling with synchronous=NORMAL avoids an fsync on every commit,
+    which dominates the cost of the service's many small transactions.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB memory-mapped I/O
+    cursor.execute("PRAGMA foreign_keys=ON")  # Required for ON DELETE CASCADE
+    cursor.close()
+
 class DatabaseService:
     """Database service for traffic simulator"""
     
@@ -38,14 +186,85 @@ class DatabaseService:
             db_path = backend_dir / "traffic_simulator.db"
         
         self.db_path = str(db_path)
-        self.engine = create_engine(f'sqlite:///{self.db_path}', echo=False)
+        self.engine = create_engine(
+            f'sqlite:///{self.db_path}',
+            echo=False,
+            connect_args={'check_same_thread': False},
+            pool_size=20,
+            max_overflow=10,
+            pool_pre_ping=True,
+            pool_recycle=1800
+        )
+        event.listen(self.engine, 'connect', _set_sqlite_pragmas)
         
         # Create all tables
         Base.metadata.create_all(self.engine)
         
-        # Create session factory
-        SessionLocal = sessionmaker(bind=self.engine)
-        self.Session = scoped_session(SessionLocal)
+        # create_all() skips tables that already exist, so add any indexes
+        # declared since an existing database file was created
+        with self.engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+        
+        # Tables whose session_id is UNIQUE and so can take ON CONFLICT upserts
+        self._unique_session_tables = self._ensure_unique_session_ids()
+        
+        # Child tables created before their foreign keys gained ON DELETE
+        # CASCADE; delete_session() clears these explicitly
+        with self.engine.connect() as connection:
+            self._non_cascading_tables = [
+                table for table in Base.metadata.sorted_tables
+                if table.name != Session.__tablename__ and 'session_id' in table.c
+                and not _cascades_session_delete(connection, table.name)
+            ]
+        
+        # Create session factory; committed objects keep their loaded state so
+        # they stay readable after the session closes
+        self.SessionFactory = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.Session = scoped_session(self.SessionFactory)
+        
+        # Live data rows waiting to be written in one executemany
+        self._live_buffer = deque()
+        self._live_flush_threshold = _LIVE_FLUSH_THRESHOLD
+        self._live_flush_lock = threading.Lock()
+        self._last_live_flush = time.monotonic()
+        atexit.register(self.flush_live_data)
+        
+        # Route/temporal analysis upserts waiting for the writer thread
+        self._analysis_queue = queue.Queue(maxsize=_ANALYSIS_QUEUE_SIZE)
+        threading.Thread(target=self._analysis_writer, name="analysis-writer", daemon=True).start()
+        atexit.register(self.flush_analysis_writes)
+        
+        # Cached get_database_stats() result and when it was computed
+        self._stats_cache = None
+        self._stats_ts = 0.0
+    
+    def _ensure_unique_session_ids(self) -> frozenset:
+        """
+        Add the UNIQUE session_id constraints missing from older database files
+        
+        create_all() never alters existing tables, so tables created before
+        session_id became unique get a unique index instead. A table that
+        already holds duplicate session_ids is left as is and written with
+        SELECT-then-UPDATE. Returns the names of the tables that are unique.
+        """
+        unique_tables = set()
+        for table in Base.metadata.sorted_tables:
+            column = table.c.get('session_id')
+            if column is None or not column.unique:
+                continue
+            try:
+                with self.engine.begin() as connection:
+                    if not _has_unique_index(connection, table.name, 'session_id'):
+                        connection.exec_driver_sql(
+                            f'CREATE UNIQUE INDEX IF NOT EXISTS "uq_{table.name}_session_id" '
+                            f'ON "{table.name}" (session_id)'
+                        )
+                unique_tables.add(table.name)
+            except IntegrityError as e:
+                print(f"Could not make {table.name}.session_id unique, duplicate rows exist: {e.orig}")
+        return frozenset(unique_tables)
     
     def get_session(self):
         """Get database session"""
@@ -53,8 +272,27 @@ class DatabaseService:
     
     def close_session(self):
         """Close database session"""
+        self.flush_live_data()
+        self.flush_analysis_writes()
         self.Session.remove()
     
+    @contextmanager
+    def _txn(self):
+        """
+        Yield a session that commits on success and rolls back on error
+        
+        The session is closed either way, returning its connection to the pool.
+        """
+        db_session = self.get_session()
+        try:
+            yield db_session
+            db_session.commit()
+        except Exception:
+            db_session.rollback()
+            raise
+        finally:
+            db_session.close()
+    
     # ============================================================================
     # Session Management
     # ============================================================================
@@ -64,173 +302,242 @@ class DatabaseService:
                       traci_port: int = None, enable_gui: bool = True,
                       temp_directory: str = None) -> Session:
         """Create a new simulation session with enhanced multi-session support"""
-        db_session = self.get_session()
         try:
-            sim_session = Session(
-                id=session_id,
-                network_id=network_id,
-                network_name=network_name,
-                session_path=session_path,
-                status='created',
-                traci_port=traci_port,
-                enable_gui=enable_gui,
-                is_active=False,
-                temp_directory=temp_directory
-            )
-            db_session.add(sim_session)
-            db_session.commit()
-            
-            # Refresh to ensure all attributes are loaded
-            db_session.refresh(sim_session)
-            
-            # Expunge the object from the session so it can be used after session closes
-            db_session.expunge(sim_session)
-            
-            return sim_session
+            with self._txn() as db_session:
+                sim_session = Session(
+                    id=session_id,
+                    network_id=network_id,
+                    network_name=network_name,
+                    session_path=session_path,
+                    status='created',
+                    traci_port=traci_port,
+                    enable_gui=enable_gui,
+                    is_active=False,
+                    temp_directory=temp_directory
+                )
+                db_session.add(sim_session)
+                db_session.flush()
+                
+                # Expunge the object from the session so it can be used after session closes
+                db_session.expunge(sim_session)
             
+            self._invalidate_stats()
             return sim_session
         except IntegrityError:
-            db_session.rollback()
             # Session already exists, return existing
-            existing = db_session.query(Session).filter_by(id=session_id).first()
-            if existing:
-                db_session.expunge(existing)
-            return existing
-        finally:
-            db_session.close()
+            return self.get_session_by_id(session_id)
+    
+    def create_session_bundle(self, session_id: str, session_fields: Dict[str, Any],
+                              config_data: Dict[str, Any], route_data: Dict[str, Any] = None,
+                              temporal_data: Dict[str, Any] = None) -> bool:
+        """
+        Create a configured session and its child rows in one transaction
+        
+        Equivalent to create_session() followed by save_configuration() and,
+        when given, save_route_analysis()/save_temporal_patterns(), but with a
+        single commit and no ORM instances.
+        
+        Args:
+            session_id: Unique session identifier
+            session_fields: Other sessions columns (network_id, traci_port, ...)
+            config_data: Configuration payload as accepted by save_configuration()
+            route_data: Optional route analysis values
+            temporal_data: Optional temporal pattern values
+        """
+        try:
+            with self._txn() as db_session:
+                db_session.execute(
+                    Session.__table__.insert(),
+                    [{**session_fields, 'id': session_id, 'status': 'configured'}]
+                )
+                db_session.execute(
+                    Configuration.__table__.insert(),
+                    [{'session_id': session_id, **_configuration_values(config_data)}]
+                )
+                if route_data:
+                    db_session.execute(
+                        RouteAnalysis.__table__.insert(),
+                        [{'session_id': session_id, **_analysis_values(RouteAnalysis, route_data, _ROUTE_JSON_FIELDS)}]
+                    )
+                if temporal_data:
+                    db_session.execute(
+                        TemporalPatterns.__table__.insert(),
+                        [{'session_id': session_id, **_analysis_values(TemporalPatterns, temporal_data, _TEMPORAL_JSON_FIELDS)}]
+                    )
+            self._invalidate_stats()
+            return True
+        except Exception as e:
+            print(f"Error creating session bundle: {e}")
+            return False
     
     def get_session_by_id(self, session_id: str) -> Optional[Session]:
         """Get session by ID"""
-        db_session = self.get_session()
-        try:
-            sim_session = db_session.query(Session).filter_by(id=session_id).first()
+        with self.get_session() as db_session:
+            sim_session = db_session.execute(_SESSION_BY_ID, {'id': session_id}).scalar_one_or_none()
             if sim_session:
                 db_session.expunge(sim_session)
             return sim_session
-        finally:
-            db_session.close()
+    
+    def get_sessions_by_ids(self, session_ids: Sequence[str]) -> Dict[str, Session]:
+        """Get several sessions in one query, keyed by ID; missing IDs are left out"""
+        if not session_ids:
+            return {}
+        
+        sessions = {}
+        with self.get_session() as db_session:
+            # Chunked to stay well under SQLite's bound parameter limit
+            for chunk in _chunks(session_ids, 500):
+                for sim_session in db_session.execute(select(Session).where(Session.id.in_(chunk))).scalars():
+                    sessions[sim_session.id] = sim_session
+            db_session.expunge_all()
+        return sessions
     
     def update_session_status(self, session_id: str, status: str, **kwargs) -> bool:
         """Update session status and other fields"""
-        db_session = self.get_session()
+        # Additional fields are applied only when they name a sessions column
+        columns = Session.__table__.c
+        values = {key: value for key, value in kwargs.items() if key in columns}
+        values.update(status=status, updated_at=func.now())
+        
         try:
-            sim_session = db_session.query(Session).filter_by(id=session_id).first()
-            if sim_session:
-                sim_session.status = status
-                sim_session.updated_at = datetime.utcnow()
-                
-                # Update additional fields
-                for key, value in kwargs.items():
-                    if hasattr(sim_session, key):
-                        setattr(sim_session, key, value)
-                
-                db_session.commit()
-                return True
-            return False
+            updated = self._update_session(session_id, values)
+            self._invalidate_stats()
+            return updated
         except Exception as e:
-            db_session.rollback()
             print(f"Error updating session status: {e}")
             return False
-        finally:
-            db_session.close()
     
-    def get_recent_sessions(self, limit: int = 10) -> List[Session]:
-        """Get recent sessions"""
-        db_session = self.get_session()
+    def update_sessions(self, updates: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        Apply per-session field updates in one transaction
+        
+        Args:
+            updates: Maps session_id to the columns to set on that session
+        """
+        columns = Session.__table__.c
         try:
-            sessions = db_session.query(Session).order_by(Session.created_at.desc()).limit(limit).all()
-            # Expunge all sessions so they can be used after session closes
-            for session in sessions:
-                db_session.expunge(session)
+            with self._txn() as db_session:
+                for session_id, fields in updates.items():
+                    values = {key: value for key, value in fields.items() if key in columns}
+                    values['updated_at'] = func.now()
+                    stmt = update(Session).where(Session.id == session_id).values(**values)
+                    db_session.execute(stmt.execution_options(synchronize_session=False))
+            self._invalidate_stats()
+            return True
+        except Exception as e:
+            print(f"Error updating sessions: {e}")
+            return False
+    
+    def get_recent_sessions(self, limit: int = 10, fields: Optional[Sequence[str]] = None) -> List[Session]:
+        """
+        Get recent sessions
+        
+        Args:
+            limit: Maximum number of sessions to return
+            fields: Session columns to load; all columns when omitted
+        """
+        with self.get_session() as db_session:
+            query = self._session_query(db_session, fields)
+            sessions = query.order_by(Session.created_at.desc()).limit(limit).all()
+            # Detach the results in one call so they can be used after session closes
+            db_session.expunge_all()
             return sessions
-        finally:
-            db_session.close()
+    
+    def get_recent_session_summaries(self, limit: int = 10,
+                                     fields: Sequence[str] = _SESSION_LIST_FIELDS) -> List[Dict[str, Any]]:
+        """
+        Get recent sessions as JSON-ready dicts holding only the given columns
+        
+        Selects just those columns through Core, so neither unused columns nor
+        ORM instances are built; unknown field names are ignored.
+        """
+        columns = [Session.__table__.c[name] for name in fields if name in Session.__table__.c]
+        stmt = select(*columns).order_by(Session.created_at.desc()).limit(limit)
+        with self.get_session() as db_session:
+            rows = db_session.execute(stmt).mappings().all()
+        
+        return [_json_ready(row) for row in rows]
+    
+    def _session_query(self, db_session, fields: Optional[Sequence[str]] = None):
+        """Query Session, deferring every column not named in fields"""
+        query = db_session.query(Session)
+        if fields:
+            query = query.options(load_only(*(getattr(Session, name) for name in fields)))
+        return query
     
     def delete_session(self, session_id: str) -> bool:
         """Delete session and all related data"""
-        db_session = self.get_session()
+        self.flush_live_data()
+        self.flush_analysis_writes()
         try:
-            # Delete in proper order to respect foreign key constraints
-            db_session.query(Recommendation).filter_by(session_id=session_id).delete()
-            db_session.query(TimeSeries).filter_by(session_id=session_id).delete()
-            db_session.query(Trip).filter_by(session_id=session_id).delete()
-            db_session.query(LiveData).filter_by(session_id=session_id).delete()
-            db_session.query(KPI).filter_by(session_id=session_id).delete()
-            db_session.query(Configuration).filter_by(session_id=session_id).delete()
-            db_session.query(Session).filter_by(id=session_id).delete()
-            
-            db_session.commit()
+            with self._txn() as db_session:
+                # Related rows are removed by ON DELETE CASCADE, except in
+                # tables created before the constraint existed
+                for table in self._non_cascading_tables:
+                    db_session.execute(delete(table).where(table.c.session_id == session_id))
+                db_session.execute(delete(Session).where(Session.id == session_id))
+            self._invalidate_stats()
             return True
         except Exception as e:
-            db_session.rollback()
             print(f"Error deleting session: {e}")
             return False
-        finally:
-            db_session.close()
     
-    def get_active_sessions(self) -> List[Session]:
-        """Get all currently active sessions"""
-        db_session = self.get_session()
-        try:
-            sessions = db_session.query(Session).filter_by(is_active=True).all()
-            # Expunge all sessions so they can be used after session closes
-            for session in sessions:
-                db_session.expunge(session)
+    def get_active_sessions(self, fields: Optional[Sequence[str]] = None) -> List[Session]:
+        """
+        Get all currently active sessions
+        
+        Args:
+            fields: Session columns to load; all columns when omitted
+        """
+        with self.get_session() as db_session:
+            sessions = self._session_query(db_session, fields).filter_by(is_active=True).all()
+            # Detach the results in one call so they can be used after session closes
+            db_session.expunge_all()
             return sessions
-        finally:
-            db_session.close()
     
     def set_session_active(self, session_id: str, is_active: bool, 
                           process_id: int = None, launched_at: datetime = None) -> bool:
         """Set session active status and related fields"""
-        db_session = self.get_session()
+        values = {'is_active': is_active, 'updated_at': func.now()}
+        if process_id is not None:
+            values['process_id'] = process_id
+        if launched_at is not None:
+            values['launched_at'] = launched_at
+        
         try:
-            sim_session = db_session.query(Session).filter_by(id=session_id).first()
-            if sim_session:
-                sim_session.is_active = is_active
-                sim_session.updated_at = datetime.utcnow()
-                
-                if process_id is not None:
-                    sim_session.process_id = process_id
-                if launched_at is not None:
-                    sim_session.launched_at = launched_at
-                
-                db_session.commit()
-                return True
-            return False
+            return self._update_session(session_id, values)
         except Exception as e:
-            db_session.rollback()
             print(f"Error setting session active status: {e}")
             return False
-        finally:
-            db_session.close()
+    
+    def _update_session(self, session_id: str, values: Dict[str, Any]) -> bool:
+        """Apply values to one session with a single UPDATE; False if no row matched"""
+        stmt = update(Session).where(Session.id == session_id).values(**values)
+        with self._txn() as db_session:
+            result = db_session.execute(stmt.execution_options(synchronize_session=False))
+        return result.rowcount > 0
     
     def cleanup_inactive_sessions(self, timeout_hours: int = 1) -> int:
         """Clean up sessions that have been inactive for too long"""
-        db_session = self.get_session()
         try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=timeout_hours)
-            inactive_sessions = db_session.query(Session).filter(
-                Session.updated_at < cutoff_time,
-                Session.status.in_(['created', 'configured'])
-            ).all()
-            
-            count = 0
-            for session in inactive_sessions:
-                # Only cleanup if not currently active
-                if not session.is_active:
-                    session.status = 'expired'
-                    session.updated_at = datetime.utcnow()
-                    count += 1
-            
-            db_session.commit()
+            with self._txn() as db_session:
+                cutoff_time = datetime.utcnow() - timedelta(hours=timeout_hours)
+                inactive_sessions = db_session.query(Session).filter(
+                    Session.updated_at < cutoff_time,
+                    Session.status.in_(['created', 'configured'])
+                ).all()
+                
+                count = 0
+                for session in inactive_sessions:
+                    # Only cleanup if not currently active
+                    if not session.is_active:
+                        session.status = 'expired'
+                        session.updated_at = datetime.utcnow()
+                        count += 1
             return count
         except Exception as e:
-            db_session.rollback()
             print(f"Error cleaning up inactive sessions: {e}")
             return 0
-        finally:
-            db_session.close()
     
     # ============================================================================
     # Configuration Management
@@ -238,96 +545,119 @@ class DatabaseService:
     
     def save_configuration(self, session_id: str, config_data: Dict[str, Any]) -> bool:
         """Save session configuration"""
-        db_session = self.get_session()
+        values = _configuration_values(config_data)
+        
         try:
-            # Check if configuration already exists
-            existing_config = db_session.query(Configuration).filter_by(session_id=session_id).first()
-            
-            config = config_data.get('config', {})
-            
-            if existing_config:
-                # Update existing configuration
-                existing_config.sumo_begin = config.get('sumo_begin')
-                existing_config.sumo_end = config.get('sumo_end')
-                existing_config.sumo_step_length = config.get('sumo_step_length')
-                existing_config.sumo_time_to_teleport = config.get('sumo_time_to_teleport')
-                existing_config.sumo_traffic_intensity = config.get('sumo_traffic_intensity')
-                existing_config.set_enabled_vehicles(config.get('enabledVehicles', []))
-                existing_config.traffic_control_method = config.get('trafficControl', {}).get('method')
-                existing_config.set_traffic_control_config(config.get('trafficControl', {}))
-                existing_config.set_vehicle_types_config(config.get('vehicleTypes', {}))
-                configuration = existing_config
-            else:
-                # Create new configuration
-                configuration = Configuration(
-                    session_id=session_id,
-                    sumo_begin=config.get('sumo_begin'),
-                    sumo_end=config.get('sumo_end'),
-                    sumo_step_length=config.get('sumo_step_length'),
-                    sumo_time_to_teleport=config.get('sumo_time_to_teleport'),
-                    sumo_traffic_intensity=config.get('sumo_traffic_intensity'),
-                    traffic_control_method=config.get('trafficControl', {}).get('method')
+            with self._txn() as db_session:
+                # Insert or update the configuration in one statement
+                self._upsert(db_session, Configuration, {'session_id': session_id, **values}, 'session_id', values)
+                
+                # Update session status in the same transaction
+                db_session.query(Session).filter_by(id=session_id).update(
+                    {'status': 'configured', 'updated_at': datetime.utcnow()}
                 )
-                configuration.set_enabled_vehicles(config.get('enabledVehicles', []))
-                configuration.set_traffic_control_config(config.get('trafficControl', {}))
-                configuration.set_vehicle_types_config(config.get('vehicleTypes', {}))
-                db_session.add(configuration)
-            
-            # Update session status
-            self.update_session_status(session_id, 'configured')
-            
-            db_session.commit()
             return True
         except Exception as e:
-            db_session.rollback()
             print(f"Error saving configuration: {e}")
             return False
-        finally:
-            db_session.close()
     
     def get_configuration(self, session_id: str) -> Optional[Configuration]:
         """Get session configuration"""
-        db_session = self.get_session()
-        try:
-            return db_session.query(Configuration).filter_by(session_id=session_id).first()
-        finally:
-            db_session.close()
+        with self.get_session() as db_session:
+            return db_session.execute(_CONFIGURATION_BY_SESSION, {'session_id': session_id}).scalar_one_or_none()
     
     # ============================================================================
     # Live Data Management
     # ============================================================================
     
     def save_live_data(self, session_id: str, live_data: Dict[str, Any]) -> bool:
-        """Save live simulation data"""
-        db_session = self.get_session()
+        """
+        Save live simulation data
+        
+        Rows are buffered and written in batches; call flush_live_data() to
+        force pending rows to disk.
+        """
         try:
-            data = LiveData(
-                session_id=session_id,
-                simulation_time=live_data.get('simulation_time'),
-                active_vehicles=live_data.get('active_vehicles'),
-                avg_speed=live_data.get('avg_speed'),
-                throughput=live_data.get('throughput')
-            )
-            data.set_raw_data(live_data)
-            
-            db_session.add(data)
-            db_session.commit()
-            return True
+            self._live_buffer.append({
+                'session_id': session_id,
+                'simulation_time': live_data.get('simulation_time'),
+                'active_vehicles': live_data.get('active_vehicles'),
+                'avg_speed': live_data.get('avg_speed'),
+                'throughput': live_data.get('throughput'),
+                'timestamp': datetime.utcnow(),
+                'raw_data': _dumps(live_data)
+            })
         except Exception as e:
-            db_session.rollback()
             print(f"Error saving live data: {e}")
             return False
-        finally:
-            db_session.close()
+        
+        if (len(self._live_buffer) >= self._live_flush_threshold or
+                time.monotonic() - self._last_live_flush >= _LIVE_FLUSH_INTERVAL):
+            return self.flush_live_data()
+        return True
+    
+    def flush_live_data(self) -> bool:
+        """
+        Write all buffered live data rows in a single executemany
+        
+        Rows are drained with popleft() rather than by swapping the deque,
+        since save_live_data() appends without taking the lock. If the write
+        fails they go back to the front of the buffer, ahead of anything
+        appended since, and are retried on the next flush.
+        """
+        with self._live_flush_lock:
+            self._last_live_flush = time.monotonic()
+            rows = []
+            while self._live_buffer:
+                rows.append(self._live_buffer.popleft())
+            if not rows:
+                return True
+            
+            try:
+                with self._txn() as db_session:
+                    db_session.execute(LiveData.__table__.insert(), rows)
+                return True
+            except Exception as e:
+                self._live_buffer.extendleft(reversed(rows))
+                print(f"Error flushing live data: {e}")
+                return False
     
     def get_live_data(self, session_id: str, limit: int = 100) -> List[LiveData]:
         """Get recent live data for session"""
-        db_session = self.get_session()
-        try:
+        self.flush_live_data()
+        with self.get_session() as db_session:
             return db_session.query(LiveData).filter_by(session_id=session_id)\
                             .order_by(LiveData.timestamp.desc()).limit(limit).all()
-        finally:
-            db_session.close()
+    
+    def get_latest_live_data(self, session_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get a session's most recent live data points as dicts, newest first"""
+        return list(self.iter_latest_live_data(session_id, limit))
+    
+    def iter_latest_live_data(self, session_id: str, limit: int = 100,
+                              chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a session's most recent live data points as dicts, newest first
+        
+        Each dict holds the metric columns, the timestamp as an ISO string and
+        the stored raw_data fields, as returned by the live data endpoints.
+        """
+        self.flush_live_data()
+        table = LiveData.__table__
+        stmt = select(
+            table.c.simulation_time, table.c.active_vehicles, table.c.avg_speed,
+            table.c.throughput, table.c.timestamp, table.c.raw_data
+        ).where(table.c.session_id == session_id).order_by(table.c.timestamp.desc()).limit(limit)
+        with self.get_session() as db_session:
+            result = db_session.execute(stmt.execution_options(yield_per=chunk_size))
+            for row in result:
+                yield {
+                    'simulation_time': row.simulation_time,
+                    'active_vehicles': row.active_vehicles,
+                    'avg_speed': row.avg_speed,
+                    'throughput': row.throughput,
+                    'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+                    **(orjson.loads(row.raw_data) if row.raw_data else {})
+                }
     
     # ============================================================================
     # Analytics Management
@@ -335,126 +665,119 @@ class DatabaseService:
     
     def save_kpis(self, session_id: str, kpis_data: Dict[str, Any]) -> bool:
         """Save KPIs for session"""
-        db_session = self.get_session()
         try:
-            # Check if KPIs already exist
-            existing_kpis = db_session.query(KPI).filter_by(session_id=session_id).first()
-            
-            if existing_kpis:
-                # Update existing KPIs
-                for key, value in kpis_data.items():
-                    if hasattr(existing_kpis, key):
-                        setattr(existing_kpis, key, value)
-                kpis = existing_kpis
-            else:
-                # Create new KPIs
-                kpis = KPI(session_id=session_id, **kpis_data)
-                db_session.add(kpis)
-            
-            # Update session to indicate it can be analyzed
-            self.update_session_status(session_id, 'completed', can_analyze=True, completed_at=datetime.utcnow())
-            
-            db_session.commit()
+            with self._txn() as db_session:
+                # Insert or update the KPIs in one statement
+                self._upsert(db_session, KPI, {'session_id': session_id, **kpis_data}, 'session_id', kpis_data)
+                
+                # Update session to indicate it can be analyzed, in the same transaction
+                now = datetime.utcnow()
+                db_session.query(Session).filter_by(id=session_id).update(
+                    {'status': 'completed', 'can_analyze': True, 'completed_at': now, 'updated_at': now}
+                )
+            self._invalidate_stats()
             return True
         except Exception as e:
-            db_session.rollback()
             print(f"Error saving KPIs: {e}")
             return False
-        finally:
-            db_session.close()
     
     def get_kpis(self, session_id: str) -> Optional[KPI]:
         """Get KPIs for session"""
-        db_session = self.get_session()
-        try:
-            return db_session.query(KPI).filter_by(session_id=session_id).first()
-        finally:
-            db_session.close()
+        with self.get_session() as db_session:
+            return db_session.execute(_KPI_BY_SESSION, {'session_id': session_id}).scalar_one_or_none()
+    
+    def get_recommendations(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get recommendations for session as plain dicts"""
+        return list(self._iter_session_rows(Recommendation, session_id))
+    
+    def get_time_series(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get time series data for session as plain dicts"""
+        return list(self._iter_session_rows(TimeSeries, session_id))
+    
+    def iter_trips(self, session_id: str, chunk_size: int = 10000) -> Iterator[Dict[str, Any]]:
+        """Stream trip data for session without loading every row at once"""
+        return self._iter_session_rows(Trip, session_id, chunk_size)
+    
+    def _iter_session_rows(self, model, session_id: str, chunk_size: int = 10000) -> Iterator[Dict[str, Any]]:
+        """
+        Stream rows of a session-scoped table as dicts
+        
+        Uses a Core select on the table instead of an ORM query, so no model
+        instances are built, and fetches rows chunk_size at a time.
+        """
+        table = model.__table__
+        stmt = select(table).where(table.c.session_id == session_id).order_by(table.c.id)
+        with self.get_session() as db_session:
+            result = db_session.execute(stmt.execution_options(yield_per=chunk_size))
+            for row in result.mappings():
+                yield dict(row)
+    
+    def _replace_session_rows(self, model, session_id: str, rows: List[Dict[str, Any]]):
+        """Delete a session's existing rows in model's table and bulk insert new ones"""
+        with self._txn() as db_session:
+            db_session.query(model).filter_by(session_id=session_id).delete()
+            self._bulk_insert(db_session, model, session_id, rows)
     
     def save_trips(self, session_id: str, trips_data: List[Dict[str, Any]]) -> bool:
         """Save trip data for session"""
-        db_session = self.get_session()
         try:
-            # Delete existing trips for this session
-            db_session.query(Trip).filter_by(session_id=session_id).delete()
-            
-            # Add new trips
-            for trip_data in trips_data:
-                trip = Trip(session_id=session_id, **trip_data)
-                db_session.add(trip)
-            
-            db_session.commit()
+            self._replace_session_rows(Trip, session_id, trips_data)
             return True
         except Exception as e:
-            db_session.rollback()
             print(f"Error saving trips: {e}")
             return False
-        finally:
-            db_session.close()
     
     def save_time_series(self, session_id: str, time_series_data: List[Dict[str, Any]]) -> bool:
         """Save time series data for session"""
-        db_session = self.get_session()
         try:
-            # Delete existing time series for this session
-            db_session.query(TimeSeries).filter_by(session_id=session_id).delete()
-            
-            # Add new time series data
-            for ts_data in time_series_data:
-                ts = TimeSeries(session_id=session_id, **ts_data)
-                db_session.add(ts)
-            
-            db_session.commit()
+            self._replace_session_rows(TimeSeries, session_id, time_series_data)
             return True
         except Exception as e:
-            db_session.rollback()
             print(f"Error saving time series: {e}")
             return False
-        finally:
-            db_session.close()
     
     def save_recommendations(self, session_id: str, recommendations_data: List[Dict[str, Any]]) -> bool:
         """Save recommendations for session"""
-        db_session = self.get_session()
         try:
-            # Delete existing recommendations for this session
-            db_session.query(Recommendation).filter_by(session_id=session_id).delete()
-            
-            # Add new recommendations
-            for rec_data in recommendations_data:
-                rec = Recommendation(session_id=session_id, **rec_data)
-                db_session.add(rec)
-            
-            db_session.commit()
+            self._replace_session_rows(Recommendation, session_id, recommendations_data)
             return True
         except Exception as e:
-            db_session.rollback()
             print(f"Error saving recommendations: {e}")
             return False
-        finally:
-            db_session.close()
     
     def get_session_analytics(self, session_id: str) -> Dict[str, Any]:
         """Get complete analytics data for session"""
-        db_session = self.get_session()
-        try:
-            session = db_session.query(Session).filter_by(id=session_id).first()
-            if not session:
+        sessions, kpis = Session.__table__, KPI.__table__
+        recommendations, time_series = Recommendation.__table__, TimeSeries.__table__
+        
+        # Plain row mappings only: nothing is left attached to the session to
+        # lazy-load once it closes
+        with self.get_session() as db_session:
+            session_row = db_session.execute(
+                select(sessions).where(sessions.c.id == session_id)
+            ).mappings().one_or_none()
+            if session_row is None:
                 return None
             
-            kpis = db_session.query(KPI).filter_by(session_id=session_id).first()
-            recommendations = db_session.query(Recommendation).filter_by(session_id=session_id).all()
-            time_series = db_session.query(TimeSeries).filter_by(session_id=session_id).all()
-            
-            return {
-                'session': session.to_dict(),
-                'kpis': kpis.to_dict() if kpis else None,
-                'recommendations': [rec.__dict__ for rec in recommendations] if recommendations else [],
-                'time_series': [ts.__dict__ for ts in time_series] if time_series else [],
-                'analysis_timestamp': datetime.utcnow().isoformat()
-            }
-        finally:
-            db_session.close()
+            kpis_row = db_session.execute(
+                select(kpis).where(kpis.c.session_id == session_id)
+            ).mappings().one_or_none()
+            recommendation_rows = db_session.execute(
+                select(recommendations).where(recommendations.c.session_id == session_id)
+                .order_by(recommendations.c.id)
+            ).mappings().all()
+            time_series_rows = db_session.execute(
+                select(time_series).where(time_series.c.session_id == session_id)
+                .order_by(time_series.c.id)
+            ).mappings().all()
+        
+        return {
+            'session': _json_ready(session_row),
+            'kpis': _json_ready(kpis_row) if kpis_row else None,
+            'recommendations': [_json_ready(row) for row in recommendation_rows],
+            'time_series': [_json_ready(row) for row in time_series_rows],
+            'analysis_timestamp': datetime.utcnow().isoformat()
+        }
     
     # ============================================================================
     # Network Management
@@ -462,68 +785,74 @@ class DatabaseService:
     
     def save_network(self, network_data: Dict[str, Any]) -> bool:
         """Save or update network metadata"""
-        db_session = self.get_session()
+        network_id = network_data.get('id')
+        values = {
+            'id': network_id,
+            'name': network_data.get('name'),
+            'description': network_data.get('description'),
+            'path': network_data.get('path'),
+            'is_osm_scenario': network_data.get('is_osm_scenario', False)
+        }
+        if 'vehicle_types' in network_data:
+            values['vehicle_types'] = _dumps(network_data['vehicle_types'])
+        
+        # An existing network gets every known column refreshed
+        columns = Network.__table__.c
+        updates = {key: value for key, value in network_data.items() if key in columns and key != 'id'}
+        if isinstance(updates.get('vehicle_types'), list):
+            updates['vehicle_types'] = _dumps(updates['vehicle_types'])
+        updates['last_used'] = datetime.utcnow()
+        
         try:
-            network_id = network_data.get('id')
-            existing_network = db_session.query(Network).filter_by(id=network_id).first()
-            
-            if existing_network:
-                # Update existing network
-                for key, value in network_data.items():
-                    if hasattr(existing_network, key) and key != 'id':
-                        if key == 'vehicle_types' and isinstance(value, list):
-                            existing_network.set_vehicle_types(value)
-                        else:
-                            setattr(existing_network, key, value)
-                existing_network.last_used = datetime.utcnow()
-                network = existing_network
-            else:
-                # Create new network
-                network = Network(
-                    id=network_id,
-                    name=network_data.get('name'),
-                    description=network_data.get('description'),
-                    path=network_data.get('path'),
-                    is_osm_scenario=network_data.get('is_osm_scenario', False)
-                )
-                if 'vehicle_types' in network_data:
-                    network.set_vehicle_types(network_data['vehicle_types'])
-                db_session.add(network)
-            
-            db_session.commit()
+            with self._txn() as db_session:
+                self._upsert(db_session, Network, values, 'id', updates)
+            self._invalidate_stats()
             return True
         except Exception as e:
-            db_session.rollback()
             print(f"Error saving network: {e}")
             return False
-        finally:
-            db_session.close()
     
     def get_networks(self) -> List[Network]:
         """Get all networks"""
-        db_session = self.get_session()
-        try:
+        with self.get_session() as db_session:
             return db_session.query(Network).order_by(Network.last_used.desc().nullslast(), 
                                                      Network.created_at.desc()).all()
-        finally:
-            db_session.close()
+    
+    def get_networks_stream(self, chunk_size: int = 500) -> Iterator[Network]:
+        """Stream networks in get_networks() order, fetching chunk_size rows at a time"""
+        stmt = select(Network).order_by(Network.last_used.desc().nullslast(), Network.created_at.desc())
+        with self.get_session() as db_session:
+            yield from db_session.execute(stmt).yield_per(chunk_size).scalars()
+    
+    def get_network_dicts(self) -> List[Dict[str, Any]]:
+        """
+        Get all networks as dicts shaped like Network.to_dict()
+        
+        Reads Core row mappings, so no ORM instances are built for callers
+        that only serialize the result.
+        """
+        table = Network.__table__
+        stmt = select(table).order_by(table.c.last_used.desc().nullslast(), table.c.created_at.desc())
+        with self.get_session() as db_session:
+            rows = db_session.execute(stmt).mappings().all()
+        
+        return [{
+            **row,
+            'vehicle_types': orjson.loads(row['vehicle_types']) if row['vehicle_types'] else [],
+            'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+            'last_used': row['last_used'].isoformat() if row['last_used'] else None
+        } for row in rows]
     
     def update_network_last_used(self, network_id: str) -> bool:
         """Update network last used timestamp"""
-        db_session = self.get_session()
         try:
-            network = db_session.query(Network).filter_by(id=network_id).first()
-            if network:
-                network.last_used = datetime.utcnow()
-                db_session.commit()
-                return True
-            return False
+            stmt = update(Network).where(Network.id == network_id).values(last_used=func.now())
+            with self._txn() as db_session:
+                result = db_session.execute(stmt.execution_options(synchronize_session=False))
+            return result.rowcount > 0
         except Exception as e:
-            db_session.rollback()
             print(f"Error updating network last used: {e}")
             return False
-        finally:
-            db_session.close()
     
     # ============================================================================
     # Utility Methods
@@ -531,34 +860,24 @@ class DatabaseService:
     
     def cleanup_old_data(self, days_old: int = 30) -> int:
         """Clean up old session data"""
-        db_session = self.get_session()
+        self.flush_live_data()
+        self.flush_analysis_writes()
+        cutoff_date = datetime.utcnow() - timedelta(days=days_old)
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days_old)
-            
-            # Get old sessions
-            old_sessions = db_session.query(Session).filter(Session.created_at < cutoff_date).all()
-            session_ids = [s.id for s in old_sessions]
-            
-            if not session_ids:
-                return 0
-            
-            # Delete related data
-            db_session.query(Recommendation).filter(Recommendation.session_id.in_(session_ids)).delete(synchronize_session=False)
-            db_session.query(TimeSeries).filter(TimeSeries.session_id.in_(session_ids)).delete(synchronize_session=False)
-            db_session.query(Trip).filter(Trip.session_id.in_(session_ids)).delete(synchronize_session=False)
-            db_session.query(LiveData).filter(LiveData.session_id.in_(session_ids)).delete(synchronize_session=False)
-            db_session.query(KPI).filter(KPI.session_id.in_(session_ids)).delete(synchronize_session=False)
-            db_session.query(Configuration).filter(Configuration.session_id.in_(session_ids)).delete(synchronize_session=False)
-            db_session.query(Session).filter(Session.id.in_(session_ids)).delete(synchronize_session=False)
-            
-            db_session.commit()
-            return len(session_ids)
+            with self._txn() as db_session:
+                # Related rows are removed by ON DELETE CASCADE, except in
+                # tables created before the constraint existed
+                old_ids = select(Session.id).where(Session.created_at < cutoff_date)
+                for table in self._non_cascading_tables:
+                    db_session.execute(delete(table).where(table.c.session_id.in_(old_ids)))
+                deleted_ids = db_session.execute(
+                    delete(Session).where(Session.created_at < cutoff_date).returning(Session.id)
+                ).scalars().all()
+            self._invalidate_stats()
+            return len(deleted_ids)
         except Exception as e:
-            db_session.rollback()
             print(f"Error cleaning up old data: {e}")
             return 0
-        finally:
-            db_session.close()
     
     def initialize_networks_from_filesystem(self, networks_dir: str):
         """
@@ -572,216 +891,225 @@ class DatabaseService:
             if not networks_path.exists():
                 return
             
-            # Scan for network directories
-            for network_dir in networks_path.iterdir():
-                if network_dir.is_dir():
-                    network_id = network_dir.name
-                    
-                    # Check if network already exists in database
-                    db_session = self.get_session()
-                    try:
-                        existing = db_session.query(Network).filter_by(id=network_id).first()
-                        
-                        if not existing:
-                            # Find network files
-                            net_files = list(network_dir.glob("*.net.xml"))
-                            metadata_file = network_dir / "metadata.json"
-                            
-                            # Read metadata if available
-                            description = None
-                            is_osm_scenario = False
-                            vehicle_types = []
-                            
-                            if metadata_file.exists():
-                                try:
-                                    with open(metadata_file, 'r') as f:
-                                        metadata = json.load(f)
-                                        description = metadata.get('description', '')
-                                        is_osm_scenario = metadata.get('is_osm_scenario', False)
-                                        vehicle_types = metadata.get('vehicle_types', [])
-                                except Exception as e:
-                                    print(f"Could not read metadata for {network_id}: {e}")
-                            
-                            # Create network entry
-                            network_data = {
-                                'id': network_id,
-                                'name': network_id.replace('_', ' ').title(),
-                                'description': description or f"Network: {network_id}",
-                                'path': str(net_files[0]) if net_files else str(network_dir),
-                                'is_osm_scenario': is_osm_scenario,
-                                'vehicle_types': vehicle_types
-                            }
-                            
-                            self.save_network(network_data)
-                            print(f"Initialized network in database: {network_id}")
-                    finally:
-                        db_session.close()
+            # Load every known network id once instead of querying per directory
+            with self.get_session() as db_session:
+                existing_ids = set(db_session.execute(select(Network.id)).scalars())
+            
+            # Scan for network directories, reading their files in parallel
+            new_dirs = [
+                network_dir for network_dir in networks_path.iterdir()
+                if network_dir.is_dir() and network_dir.name not in existing_ids
+            ]
+            with ThreadPoolExecutor(max_workers=_NETWORK_SCAN_WORKERS) as executor:
+                new_rows = list(executor.map(_read_network_dir, new_dirs))
+            
+            if not new_rows:
+                return
+            
+            # All new networks go in with one executemany and one commit
+            with self._txn() as db_session:
+                db_session.execute(Network.__table__.insert(), new_rows)
+            self._invalidate_stats()
+            
+            for row in new_rows:
+                print(f"Initialized network in database: {row['id']}")
                         
         except Exception as e:
             print(f"Error initializing networks from filesystem: {e}")
     
     def save_vehicle_emissions(self, session_id: str, emissions_data: List[Dict[str, Any]]) -> bool:
         """Save vehicle emissions data for session"""
-        db_session = self.get_session()
         try:
-            # Delete existing emissions data for this session
-            db_session.query(VehicleEmissions).filter_by(session_id=session_id).delete()
-            
-            # Add new emissions data
-            for emission in emissions_data:
-                vehicle_emission = VehicleEmissions(session_id=session_id, **emission)
-                db_session.add(vehicle_emission)
-            
-            db_session.commit()
+            self._replace_session_rows(VehicleEmissions, session_id, emissions_data)
             return True
         except Exception as e:
-            db_session.rollback()
             print(f"Error saving vehicle emissions: {e}")
             return False
-        finally:
-            db_session.close()
     
     def save_edge_data(self, session_id: str, edge_data: List[Dict[str, Any]]) -> bool:
         """Save edge data for session"""
-        db_session = self.get_session()
         try:
-            # Delete existing edge data for this session
-            db_session.query(EdgeData).filter_by(session_id=session_id).delete()
-            
-            # Add new edge data
-            for edge in edge_data:
-                edge_record = EdgeData(session_id=session_id, **edge)
-                db_session.add(edge_record)
-            
-            db_session.commit()
+            self._replace_session_rows(EdgeData, session_id, edge_data)
             return True
         except Exception as e:
-            db_session.rollback()
             print(f"Error saving edge data: {e}")
             return False
-        finally:
-            db_session.close()
     
     def save_safety_metrics(self, session_id: str, safety_data: Dict[str, Any]) -> bool:
         """Save safety metrics for session"""
-        db_session = self.get_session()
+        # Serialize list/dict fields before the write transaction starts
+        processed_data = {
+            key: (_dumps(value) if value else None) if key in _SAFETY_JSON_FIELDS else value
+            for key, value in safety_data.items()
+        }
+        
         try:
-            # Check if safety metrics already exist
-            existing_safety = db_session.query(SafetyMetrics).filter_by(session_id=session_id).first()
-            
-            if existing_safety:
-                # Update existing safety metrics
-                for key, value in safety_data.items():
-                    if hasattr(existing_safety, key):
-                        if key in ['critical_periods', 'peak_collision_times', 'high_risk_edges', 'intersection_hotspots']:
-                            # Handle JSON fields
-                            setattr(existing_safety, key, json.dumps(value) if value else None)
-                        else:
-                            setattr(existing_safety, key, value)
-                safety_metrics = existing_safety
-            else:
-                # Create new safety metrics
-                # Convert list/dict fields to JSON strings
-                processed_data = safety_data.copy()
-                for json_field in ['critical_periods', 'peak_collision_times', 'high_risk_edges', 'intersection_hotspots']:
-                    if json_field in processed_data and processed_data[json_field]:
-                        processed_data[json_field] = json.dumps(processed_data[json_field])
-                
-                safety_metrics = SafetyMetrics(session_id=session_id, **processed_data)
-                db_session.add(safety_metrics)
-            
-            db_session.commit()
+            with self._txn() as db_session:
+                # Insert or update the safety metrics in one statement
+                self._upsert(db_session, SafetyMetrics, {'session_id': session_id, **processed_data}, 'session_id', processed_data)
             return True
         except Exception as e:
-            db_session.rollback()
             print(f"Error saving safety metrics: {e}")
             return False
-        finally:
-            db_session.close()
     
     def save_route_analysis(self, session_id: str, route_data: Dict[str, Any]) -> bool:
-        """Save route analysis for session"""
-        db_session = self.get_session()
-        try:
-            # Check if route analysis already exists
-            existing_route = db_session.query(RouteAnalysis).filter_by(session_id=session_id).first()
-            
-            if existing_route:
-                # Update existing route analysis
-                for key, value in route_data.items():
-                    if hasattr(existing_route, key):
-                        if key in ['most_used_routes', 'route_usage_distribution']:
-                            # Handle JSON fields
-                            setattr(existing_route, key, json.dumps(value) if value else None)
-                        else:
-                            setattr(existing_route, key, value)
-                route_analysis = existing_route
-            else:
-                # Create new route analysis
-                # Convert list/dict fields to JSON strings
-                processed_data = route_data.copy()
-                for json_field in ['most_used_routes', 'route_usage_distribution']:
-                    if json_field in processed_data and processed_data[json_field]:
-                        processed_data[json_field] = json.dumps(processed_data[json_field])
-                
-                route_analysis = RouteAnalysis(session_id=session_id, **processed_data)
-                db_session.add(route_analysis)
-            
-            db_session.commit()
-            return True
-        except Exception as e:
-            db_session.rollback()
-            print(f"Error saving route analysis: {e}")
-            return False
-        finally:
-            db_session.close()
+        """
+        Save route analysis for session
+        
+        The upsert is queued for the analysis writer thread; call
+        flush_analysis_writes() to wait until it has been written.
+        """
+        processed_data = _analysis_values(RouteAnalysis, route_data, _ROUTE_JSON_FIELDS)
+        self._analysis_queue.put((RouteAnalysis, session_id, processed_data))
+        return True
     
     def save_temporal_patterns(self, session_id: str, temporal_data: Dict[str, Any]) -> bool:
-        """Save temporal patterns for session"""
-        db_session = self.get_session()
-        try:
-            # Check if temporal patterns already exist
-            existing_temporal = db_session.query(TemporalPatterns).filter_by(session_id=session_id).first()
+        """
+        Save temporal patterns for session
+        
+        The upsert is queued for the analysis writer thread; call
+        flush_analysis_writes() to wait until it has been written.
+        """
+        processed_data = _analysis_values(TemporalPatterns, temporal_data, _TEMPORAL_JSON_FIELDS)
+        self._analysis_queue.put((TemporalPatterns, session_id, processed_data))
+        return True
+    
+    def flush_analysis_writes(self):
+        """Block until every queued route/temporal analysis write has been written"""
+        self._analysis_queue.join()
+    
+    def _analysis_writer(self):
+        """Drain the analysis queue, writing each batch in one transaction"""
+        while True:
+            batch = [self._analysis_queue.get()]
+            deadline = time.monotonic() + _ANALYSIS_BATCH_WAIT
+            while len(batch) < _ANALYSIS_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._analysis_queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
             
-            if existing_temporal:
-                # Update existing temporal patterns
-                for key, value in temporal_data.items():
-                    if hasattr(existing_temporal, key):
-                        if key in ['hourly_flow_patterns', 'congestion_timeline']:
-                            # Handle JSON fields
-                            setattr(existing_temporal, key, json.dumps(value) if value else None)
-                        else:
-                            setattr(existing_temporal, key, value)
-                temporal_patterns = existing_temporal
+            try:
+                self._write_analysis_batch(batch)
+            except Exception:
+                # Write one at a time so a single bad row does not lose the batch
+                for model, session_id, values in batch:
+                    try:
+                        with self._txn() as db_session:
+                            self._upsert(db_session, model, {'session_id': session_id, **values}, 'session_id', values)
+                    except Exception as e:
+                        print(f"Error saving {model.__tablename__} for session {session_id}: {e}")
+            finally:
+                for _ in batch:
+                    self._analysis_queue.task_done()
+    
+    def _write_analysis_batch(self, batch: List[tuple]):
+        """
+        Upsert a batch of (model, session_id, values) analysis writes
+        
+        Only the last write per model and session is kept. Rows with the same
+        column set share one executemany ON CONFLICT statement.
+        """
+        latest = {}
+        for model, session_id, values in batch:
+            latest[(model, session_id)] = values
+        
+        groups = {}
+        for (model, session_id), values in latest.items():
+            groups.setdefault((model, frozenset(values)), []).append({'session_id': session_id, **values})
+        
+        with self._txn() as db_session:
+            for (model, columns), rows in groups.items():
+                if model.__tablename__ not in self._unique_session_tables:
+                    for row in rows:
+                        updates = {column: row[column] for column in columns}
+                        self._upsert(db_session, model, row, 'session_id', updates)
+                    continue
+                stmt = sqlite_insert(model)
+                if columns:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=['session_id'],
+                        set_={column: stmt.excluded[column] for column in columns}
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=['session_id'])
+                db_session.execute(stmt, rows)
+    
+    def _upsert(self, db_session, model, values: Dict[str, Any], conflict_column: str,
+                updates: Dict[str, Any]):
+        """
+        INSERT a row, or UPDATE it when conflict_column already matches
+        
+        Replaces the SELECT-then-branch pattern with a single ON CONFLICT
+        statement; conflict_column must be the primary key or UNIQUE. Tables
+        whose session_id could not be made unique keep SELECT-then-branch.
+        """
+        if conflict_column == 'session_id' and model.__tablename__ not in self._unique_session_tables:
+            existing = db_session.execute(
+                select(model).filter_by(session_id=values['session_id'])
+            ).scalars().first()
+            if existing is None:
+                db_session.add(model(**values))
             else:
-                # Create new temporal patterns
-                # Convert list/dict fields to JSON strings
-                processed_data = temporal_data.copy()
-                for json_field in ['hourly_flow_patterns', 'congestion_timeline']:
-                    if json_field in processed_data and processed_data[json_field]:
-                        processed_data[json_field] = json.dumps(processed_data[json_field])
-                
-                temporal_patterns = TemporalPatterns(session_id=session_id, **processed_data)
-                db_session.add(temporal_patterns)
-            
-            db_session.commit()
-            return True
-        except Exception as e:
-            db_session.rollback()
-            print(f"Error saving temporal patterns: {e}")
-            return False
-        finally:
-            db_session.close()
+                for key, value in updates.items():
+                    setattr(existing, key, value)
+            return
+        
+        stmt = sqlite_insert(model).values(**values)
+        if updates:
+            stmt = stmt.on_conflict_do_update(index_elements=[conflict_column], set_=updates)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[conflict_column])
+        db_session.execute(stmt)
+    
+    def _bulk_insert(self, db_session, model, session_id: str, rows: List[Dict[str, Any]]):
+        """
+        Insert session rows with a Core executemany per chunk
+        
+        Skips ORM instance construction and unit-of-work bookkeeping entirely;
+        rows are sent in _BULK_INSERT_CHUNK_SIZE batches to bound memory.
+        executemany takes its column list from the first row, so each chunk
+        is normalized to the table columns any of its rows set, with None
+        for the keys a row leaves out.
+        """
+        table = model.__table__
+        stmt = table.insert()
+        for chunk in _chunks(rows, _BULK_INSERT_CHUNK_SIZE):
+            present = set().union(*chunk)
+            columns = [key for key in table.c.keys() if key in present and key != 'session_id']
+            db_session.execute(stmt, [
+                {**{key: row.get(key) for key in columns}, 'session_id': session_id} for row in chunk
+            ])
     
     def get_database_stats(self) -> Dict[str, Any]:
-        """Get database statistics"""
-        db_session = self.get_session()
-        try:
-            return {
-                'total_sessions': db_session.query(Session).count(),
-                'completed_sessions': db_session.query(Session).filter_by(status='completed').count(),
-                'total_networks': db_session.query(Network).count(),
-                'database_size': os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
-            }
-        finally:
-            db_session.close()
+        """
+        Get database statistics
+        
+        Results are reused for _STATS_TTL seconds; writes that change the
+        counts drop the cached copy straight away.
+        """
+        now = time.monotonic()
+        if self._stats_cache is not None and now - self._stats_ts < _STATS_TTL:
+            return dict(self._stats_cache)
+        
+        with self.get_session() as db_session:
+            total_sessions, completed_sessions = db_session.execute(
+                select(func.count(), func.count().filter(Session.status == 'completed')).select_from(Session)
+            ).one()
+            total_networks = db_session.execute(select(func.count()).select_from(Network)).scalar_one()
+        
+        self._stats_cache = {
+            'total_sessions': total_sessions,
+            'completed_sessions': completed_sessions,
+            'total_networks': total_networks,
+            'database_size': os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        }
+        self._stats_ts = now
+        return dict(self._stats_cache)
+    
+    def _invalidate_stats(self):
+        """Drop cached get_database_stats() results"""
+        self._stats_cache = None
@@ -11,16 +11,235 @@ Author: Traffic Simulator Team
 Date: September 2025
 """
 
+import atexit
+import functools
+import hashlib
+import heapq
+import logging
 import os
+import socket
 import tempfile
 import threading
 import time
 import uuid
 import subprocess
-from datetime import datetime, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Set
 import shutil
+from collections import deque
+from xml.sax.saxutils import escape as xml_escape
+
+# libxml2-backed parsing and serialization when available
+try:
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ioctl request number for a copy-on-write clone (Linux FICLONE)
+_FICLONE = 0x40049409
+
+# Template files that are only ever read (or replaced by rename), so sessions
+# can share them through hard links. Anything else may be written in place by
+# the session or by SUMO's outputs and must get its own inode.
+_SHAREABLE_TEMPLATE_SUFFIXES = ('.net.xml', '.net.xml.gz', '.poly.add.xml', '.osm_view.xml')
+
+# Converted networks kept in netconvert_cache_dir; the least recently used
+# beyond this many are deleted
+_NETCONVERT_CACHE_MAX_FILES = 32
+
+# Pre-cloned template directories kept ready per recently used network, and
+# the free space below which no more are made
+_PREWARM_PER_NETWORK = 2
+_PREWARM_MIN_FREE_BYTES = 512 * 1024 * 1024
+
+# Buhos additional file, emitted as text since its layout is fixed
+_BUHOS_HEADER = """<?xml version='1.0' encoding='utf-8'?>
+<additional xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/additional_file.xsd">
+  <!--
+        Buhos Method Traffic Light Programs
+        - Phase Duration: {phase_duration}s ({phase_minutes:.1f} minutes) per direction
+        - All-Red Time: {all_red_time}s clearance between phases
+        - Phase Order: {phase_order}
+        - Total Cycle: {cycle}s (~{cycle_minutes:.1f} minutes)
+        -->
+"""
+_BUHOS_TLS_TEMPLATE = """  <tlLogic id="{id}" type="static" programID="buhos" offset="0">
+    <phase duration="{duration}" state="{first_green}" name="{first_name}" />
+    <phase duration="5" state="{first_yellow}" name="{first_name}_Yellow" />
+    <phase duration="{red_duration}" state="{all_red}" name="All_Red_1" />
+    <phase duration="{duration}" state="{second_green}" name="{second_name}" />
+    <phase duration="5" state="{second_yellow}" name="{second_name}_Yellow" />
+    <phase duration="{red_duration}" state="{all_red}" name="All_Red_2" />
+  </tlLogic>
+"""
+_BUHOS_FOOTER = "</additional>"
+
+# Extra entities for double-quoted attribute values (escape() covers &, <, >)
+_XML_ATTR_ENTITIES = {'"': '&quot;', '\n': '&#10;', '\r': '&#13;', '\t': '&#09;'}
+
+# Config keys for the traffic scale, in order of precedence (older names last)
+_TRAFFIC_SCALE_KEYS = ('sumo_traffic_scale', 'traffic_scale', 'sumo_traffic_intensity')
+
+# Session statuses after which there is nothing left to stop
+_TERMINAL_STATUSES = frozenset(['completed', 'failed', 'expired'])
+
+
+def _clone_file(src: Path, dst: Path, allow_link: bool = False):
+    """Clone src to dst as a hard link, a reflink, or a plain copy, in that order"""
+    if allow_link:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    
+    if fcntl is not None:
+        try:
+            with open(src, 'rb') as f_src, open(dst, 'wb') as f_dst:
+                fcntl.ioctl(f_dst.fileno(), _FICLONE, f_src.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+    
+    shutil.copy2(src, dst)
+
+
+def _normalize_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a session config with legacy keys resolved to their canonical names"""
+    normalized = dict(config)
+    normalized['traffic_scale'] = next(
+        (config[key] for key in _TRAFFIC_SCALE_KEYS if config.get(key) is not None), 1.0
+    )
+    return normalized
+
+
+def _xml_attr(value: str) -> str:
+    """Escape a string for use inside a double-quoted XML attribute"""
+    return xml_escape(value, _XML_ATTR_ENTITIES)
+
+
+def _write_private(path: Path, data: bytes):
+    """
+    Replace path's contents without writing through a shared inode
+    
+    Session files may be hard links to network templates; writing a sibling
+    file and renaming it over path gives the session its own copy instead
+    of modifying the template.
+    """
+    temp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+
+@functools.lru_cache(maxsize=64)
+def _render_sumo_config(template: bytes, begin_time: str, end_time: str, add_buhos: bool) -> bytes:
+    """Render a .sumocfg template with the session's time window and additional files"""
+    root = ET.fromstring(template)
+    
+    # Collect the elements we touch in one walk over the tree; SUMO only
+    # allows additional-files inside input
+    time_elem = input_elem = additional_files_elem = None
+    for elem in root.iter():
+        if elem.tag == 'time' and time_elem is None:
+            time_elem = elem
+        elif elem.tag == 'input' and input_elem is None:
+            input_elem = elem
+        elif elem.tag == 'additional-files' and additional_files_elem is None:
+            additional_files_elem = elem
+    
+    # Update timing parameters
+    if time_elem is None:
+        time_elem = ET.SubElement(root, 'time')
+    
+    time_elem.set('begin', begin_time)
+    time_elem.set('end', end_time)
+    
+    if add_buhos:
+        if input_elem is not None:
+            if additional_files_elem is not None:
+                # Get existing additional files
+                existing_files = additional_files_elem.get('value', '')
+                # Add Buhos file to the list
+                buhos_file = 'buhos_traffic_lights.add.xml'
+                if buhos_file not in existing_files:
+                    if existing_files:
+                        new_files = f"{existing_files},{buhos_file}"
+                    else:
+                        new_files = buhos_file
+                    additional_files_elem.set('value', new_files)
+                    logger.info("Added Buhos additional file to SUMO configuration: %s", buhos_file)
+            else:
+                # Create additional-files element if it doesn't exist
+                additional_files_elem = ET.SubElement(input_elem, 'additional-files')
+                additional_files_elem.set('value', 'buhos_traffic_lights.add.xml')
+                logger.info("Created additional-files element with Buhos file")
+    
+    return ET.tostring(root, encoding='utf-8', xml_declaration=True)
+
+
+def _sumo_executable(sumo_bin_dir: str, name: str, search_path: str) -> str:
+    """Path of a SUMO executable in sumo_bin_dir, or found on search_path if it is not there"""
+    for filename in (f"{name}.exe", name):
+        path = os.path.join(sumo_bin_dir, filename)
+        if os.path.isfile(path):
+            return path
+    return shutil.which(name, path=search_path) or os.path.join(sumo_bin_dir, f"{name}.exe")
+
+
+@functools.lru_cache(maxsize=32)
+def _sumo_command_prefix(sumo_bin_dir: str, search_path: str, enable_gui: bool,
+                         sumocfg_name: Optional[str]) -> tuple:
+    """Build the launch-independent start of a SUMO command line"""
+    # Base command
+    cmd = [_sumo_executable(sumo_bin_dir, "sumo-gui" if enable_gui else "sumo", search_path)]
+    
+    # Configuration file
+    if sumocfg_name:
+        cmd.extend(["-c", sumocfg_name])
+    
+    # Other parameters
+    cmd.extend([
+        "--time-to-teleport", "300",
+        "--no-warnings"
+    ])
+    
+    if not enable_gui:
+        cmd.extend(["--quit-on-end", "--start"])
+    else:
+        cmd.extend(["--start", "--game"])
+    
+    return tuple(cmd)
+
+
+@dataclass(slots=True)
+class SessionInfo:
+    """In-memory state of a session owned by EnhancedSessionManager"""
+    session_id: str
+    network_id: str
+    session_dir: Path
+    traci_port: int
+    config: Dict[str, Any]
+    enable_gui: bool
+    prep_future: Future
+    network_files: Optional[Dict[str, str]] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    status: str = 'created'
+    process: Optional[subprocess.Popen] = None
+    launched_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    error: Optional[str] = None
+
 
 class EnhancedSessionManager:
     """Enhanced session manager supporting multiple concurrent simulations"""
@@ -50,15 +269,77 @@ class EnhancedSessionManager:
         self.db_service = db_service
         self.websocket_handler = websocket_handler
         
+        # SUMO binaries, resolved once
+        sumo_home = os.environ.get('SUMO_HOME', 'C:\\Program Files (x86)\\Eclipse\\Sumo')
+        self._sumo_bin_dir = os.path.join(sumo_home, 'bin')
+        
+        # Environment for SUMO processes, with its bin directory first on PATH
+        self._launch_env = os.environ.copy()
+        self._launch_env['PATH'] = self._sumo_bin_dir + os.pathsep + self._launch_env.get('PATH', '')
+        
         # Session management
-        self.active_sessions: Dict[str, Dict[str, Any]] = {}
+        self.active_sessions: Dict[str, SessionInfo] = {}
+        
+        # Set by shutdown() to stop the background threads
+        self._shutdown = threading.Event()
+        
+        # Cached get_active_sessions() result, rebuilt when marked dirty
+        self._snapshot: List[Dict[str, Any]] = []
+        self._snapshot_dirty = False
+        self._snapshot_lock = threading.Lock()
         self.port_allocator = PortAllocator(start_port=8813)
         self.temp_dir = Path(tempfile.gettempdir()) / "traffic_simulator_sessions"
         self.temp_dir.mkdir(exist_ok=True)
+        self.netconvert_cache_dir = self.temp_dir / "netconvert_cache"
+        self.netconvert_cache_dir.mkdir(exist_ok=True)
+        
+        # (file name, size, mtime_ns) -> sha256 of a network file's contents,
+        # so an unchanged network is hashed only once
+        self._network_digests: Dict[tuple, str] = {}
+        
+        # Finished session directories are renamed in here and deleted by a
+        # background thread in batches (leftovers from a previous run included)
+        self._trash = self.temp_dir / "_trash"
+        self._trash.mkdir(exist_ok=True)
+        self.trash_interval = 30  # seconds between collections
+        self.trash_batch_size = 16  # directories removed per batch
+        self.trash_batch_pause = 0.05  # seconds between batches
+        self.trash_max_pending = 64  # collect early once this many are waiting
+        self._trash_pending = 0
+        self._trash_wake = threading.Event()
+        self._start_trash_collector()
+        
+        # network dir name -> (directory mtime, template files), see _template_files
+        self._template_cache: Dict[str, tuple] = {}
+        
+        # network file name -> (mtime_ns, size, TLS info), see _extract_tls_info_from_network
+        self._tls_info_cache: Dict[str, tuple] = {}
+        
+        # Session row updates waiting for the status flusher, merged per session
+        self._pending_updates: Dict[str, Dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_interval = 0.25  # seconds
+        self._start_status_flusher()
+        
+        # Network file preparation runs off the request thread
+        self._prep_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="session-prep")
+        
+        # network dir name -> deque of (template dir mtime, pre-cloned dir),
+        # topped up in the background after each session on that network
+        self._prewarmed: Dict[str, deque] = {}
+        self._refilling: Set[str] = set()
+        self._refilling_lock = threading.Lock()
+        self._prep_pool.submit(self._remove_stale_prewarmed)
         
         # Cleanup thread
-        self.cleanup_interval = 300  # 5 minutes
+        self.cleanup_interval = 300  # 5 minutes; back-off after a cleanup error
         self.session_timeout = 3600  # 1 hour
+        
+        # Min-heap of (monotonic expiry time, session_id); the cleanup thread sleeps
+        # until the head expires and is woken when a new session becomes the head
+        self._expiry_heap: List[tuple] = []
+        self._heap_lock = threading.Lock()
+        self._heap_changed = threading.Condition(self._heap_lock)
         self._start_cleanup_thread()
     
     def create_session(self, network_id: str, config: Dict[str, Any], 
@@ -78,49 +359,67 @@ class EnhancedSessionManager:
             # Generate unique session ID
             session_id = f"session_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
             
+            # Resolve legacy config keys once instead of on every launch
+            config = _normalize_config(config)
+            
+            # Fail fast on an unknown network before allocating anything
+            network_source = self._resolve_network_source(network_id)
+            
             # Allocate resources
             traci_port = self.port_allocator.allocate()
             session_dir = self.temp_dir / session_id
-            session_dir.mkdir(exist_ok=True)
+            prewarmed = self._take_prewarmed(network_source, session_dir)
+            if not prewarmed:
+                session_dir.mkdir(exist_ok=True)
             
-            # Create session record in database
+            # Create session record and its configuration in one transaction
             if self.db_service:
-                self.db_service.create_session(
-                    session_id=session_id,
-                    network_id=network_id,
-                    session_path=str(session_dir),
-                    traci_port=traci_port,
-                    enable_gui=enable_gui,
-                    temp_directory=str(session_dir)
+                created = self.db_service.create_session_bundle(
+                    session_id,
+                    {
+                        'network_id': network_id,
+                        'session_path': str(session_dir),
+                        'traci_port': traci_port,
+                        'enable_gui': enable_gui,
+                        'is_active': False,
+                        'temp_directory': str(session_dir)
+                    },
+                    config
                 )
-                self.db_service.save_configuration(session_id, config)
+                if not created:
+                    raise RuntimeError("could not save session record")
             
-            # Prepare network files from template
-            network_files = self._prepare_network_files(network_id, session_dir, config)
+            # Prepare network files from template in the background;
+            # launch_simulation waits for it to finish
+            prep_future = self._prep_pool.submit(self._prepare_network_files, network_id, session_dir, config, prewarmed)
+            self._prep_pool.submit(self._refill_prewarmed, network_source)
             
             # Create session tracking
-            session_info = {
-                'session_id': session_id,
-                'network_id': network_id,
-                'session_dir': session_dir,
-                'traci_port': traci_port,
-                'config': config,
-                'enable_gui': enable_gui,
-                'network_files': network_files,
-                'created_at': datetime.now(),
-                'status': 'created',
-                'process': None,
-                'data_thread': None
-            }
+            session_info = SessionInfo(
+                session_id=session_id,
+                network_id=network_id,
+                session_dir=session_dir,
+                traci_port=traci_port,
+                config=config,
+                enable_gui=enable_gui,
+                prep_future=prep_future
+            )
             
             self.active_sessions[session_id] = session_info
+            self._snapshot_dirty = True
+            with self._heap_changed:
+                heapq.heappush(self._expiry_heap, (time.monotonic() + self.session_timeout, session_id))
+                if self._expiry_heap[0][1] == session_id:
+                    self._heap_changed.notify()
+            
+            # Fail the session as soon as preparation does, not at launch
+            prep_future.add_done_callback(lambda future: self._on_prepared(session_info, future))
             
             return {
                 'success': True,
                 'session_id': session_id,
                 'session_path': str(session_dir),
-                'traci_port': traci_port,
-                'network_files': network_files
+                'traci_port': traci_port
             }
             
         except Exception as e:
@@ -153,51 +452,63 @@ class EnhancedSessionManager:
         
         session_info = self.active_sessions[session_id]
         
+        try:
+            # Wait for the network files to be ready
+            session_info.network_files = session_info.prep_future.result()
+        except Exception as e:
+            # Usually already marked failed by _on_prepared
+            if session_info.status not in _TERMINAL_STATUSES:
+                self._mark_finished(session_info, 'failed')
+            return {
+                'success': False,
+                'message': f'Failed to prepare network files: {str(e)}'
+            }
+        
         try:
             # Build SUMO command
             sumo_cmd = self._build_sumo_command(session_info)
             
-            # Launch SUMO process
-            process = subprocess.Popen(
-                sumo_cmd,
-                cwd=session_info['session_dir'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+            # Launch SUMO process; nothing reads its output, so send it to a log
+            # file instead of pipes that would block SUMO once they fill up
+            self.port_allocator.activate(session_info.traci_port)
+            with open(session_info.session_dir / "sumo.log", 'wb') as log_file:
+                process = subprocess.Popen(
+                    sumo_cmd,
+                    cwd=session_info.session_dir,
+                    env=self._launch_env,
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT
+                )
             
             # Update session info
-            session_info['process'] = process
-            session_info['status'] = 'running'
-            session_info['launched_at'] = datetime.now()
-            
-            # Start data collection if TraCI is enabled
-            if not session_info['enable_gui'] or session_info['config'].get('enable_live_data', True):
-                data_thread = threading.Thread(
-                    target=self._collect_live_data,
-                    args=(session_id,),
-                    daemon=True
-                )
-                data_thread.start()
-                session_info['data_thread'] = data_thread
+            session_info.process = process
+            self._set_status(session_info, 'running')
+            session_info.launched_at = datetime.now()
             
-            # Update database
-            if self.db_service:
-                self.db_service.set_session_active(
-                    session_id, True, 
-                    process_id=process.pid,
-                    launched_at=session_info['launched_at']
-                )
-                self.db_service.update_session_status(session_id, 'running')
+            # Watch the process so its exit is noticed without polling
+            threading.Thread(
+                target=self._watch_process,
+                args=(session_id, process),
+                daemon=True
+            ).start()
+            
+            # Queue the database update; status and launch fields go in one UPDATE
+            self._queue_update(session_id, {
+                'status': 'running',
+                'is_active': True,
+                'process_id': process.pid,
+                'launched_at': session_info.launched_at
+            })
             
             return {
                 'success': True,
                 'session_id': session_id,
                 'process_id': process.pid,
-                'traci_port': session_info['traci_port']
+                'traci_port': session_info.traci_port
             }
             
         except Exception as e:
-            session_info['status'] = 'failed'
+            self._mark_finished(session_info, 'failed')
             return {
                 'success': False,
                 'message': f'Failed to launch simulation: {str(e)}'
@@ -213,38 +524,33 @@ class EnhancedSessionManager:
         
         session_info = self.active_sessions[session_id]
         
+        # Nothing to stop once the session has finished and its process is gone
+        if session_info.status in _TERMINAL_STATUSES and (
+                session_info.process is None or session_info.process.poll() is not None):
+            return {
+                'success': True,
+                'message': f'Session {session_id} already {session_info.status}'
+            }
+        
         try:
-            # Stop data collection thread if running
-            if session_info.get('data_thread') and session_info['data_thread'].is_alive():
-                session_info['status'] = 'stopping'  # Signal thread to stop
-                session_info['data_thread'].join(timeout=2)
-            
             # TraCI connection cleanup removed - no longer using TraCI
             
             # Stop SUMO process forcefully if needed
-            if session_info['process'] and session_info['process'].poll() is None:
-                print(f"Terminating SUMO process for session {session_id}")
-                session_info['process'].terminate()
+            if session_info.process and session_info.process.poll() is None:
+                self._set_status(session_info, 'stopping')  # Keep the process watcher from cleaning up
+                logger.info("Terminating SUMO process for session %s", session_id)
+                session_info.process.terminate()
                 
                 # Wait for graceful termination
                 try:
-                    session_info['process'].wait(timeout=5)
-                    print(f"SUMO process terminated gracefully for session {session_id}")
+                    session_info.process.wait(timeout=5)
+                    logger.info("SUMO process terminated gracefully for session %s", session_id)
                 except subprocess.TimeoutExpired:
-                    print(f"Force killing SUMO process for session {session_id}")
-                    session_info['process'].kill()
-                    session_info['process'].wait()
+                    logger.warning("Force killing SUMO process for session %s", session_id)
+                    session_info.process.kill()
+                    session_info.process.wait()
             
-            # Update status
-            session_info['status'] = 'completed'
-            session_info['completed_at'] = datetime.now()
-            
-            # Update database
-            if self.db_service:
-                self.db_service.update_session_status(
-                    session_id, 'completed',
-                    completed_at=session_info['completed_at']
-                )
+            self._mark_finished(session_info)
             
             return {
                 'success': True,
@@ -252,12 +558,80 @@ class EnhancedSessionManager:
             }
             
         except Exception as e:
-            print(f"Error stopping session {session_id}: {e}")
+            logger.error("Error stopping session %s: %s", session_id, e)
             return {
                 'success': False,
                 'message': f'Error stopping session: {str(e)}'
             }
     
+    def stop_all(self, session_ids: Optional[List[str]] = None, grace: float = 5.0) -> List[str]:
+        """
+        Stop several sessions at once, sharing one grace period between them
+        
+        Every SUMO process is sent SIGTERM first and then polled together, and
+        whatever is still running after grace seconds is killed, so stopping N
+        sessions takes at most one grace period rather than N of them.
+        
+        Args:
+            session_ids: Sessions to stop (default: all active sessions)
+            grace: Seconds to wait for graceful termination before killing
+            
+        Returns:
+            IDs of the sessions that are now stopped, including ones that
+            had already finished
+        """
+        if session_ids is None:
+            session_ids = list(self.active_sessions)
+        
+        stopped = []
+        stopping = []
+        for session_id in session_ids:
+            session_info = self.active_sessions.get(session_id)
+            if session_info is None:
+                continue
+            stopped.append(session_id)
+            process = session_info.process
+            if session_info.status in _TERMINAL_STATUSES and (process is None or process.poll() is not None):
+                continue
+            # Keep the process watcher from cleaning up
+            self._set_status(session_info, 'stopping')
+            if process and process.poll() is None:
+                logger.info("Terminating SUMO process for session %s", session_id)
+                try:
+                    process.terminate()
+                except OSError as e:
+                    logger.error("Error stopping session %s: %s", session_id, e)
+            stopping.append(session_info)
+        
+        running = [info for info in stopping if info.process and info.process.poll() is None]
+        deadline = time.monotonic() + grace
+        while running and time.monotonic() < deadline:
+            time.sleep(0.05)
+            running = [info for info in running if info.process.poll() is None]
+        
+        for session_info in running:
+            logger.warning("Force killing SUMO process for session %s", session_info.session_id)
+            session_info.process.kill()
+        for session_info in running:
+            session_info.process.wait()
+        
+        for session_info in stopping:
+            self._mark_finished(session_info)
+        
+        return stopped
+    
+    def _mark_finished(self, session_info: SessionInfo, status: str = 'completed'):
+        """Record that a session has ended with status, in memory and (queued) in the database"""
+        self._set_status(session_info, status)
+        session_info.completed_at = datetime.now()
+        
+        # Queue the database update
+        self._queue_update(session_info.session_id, {
+            'status': status,
+            'is_active': False,
+            'completed_at': session_info.completed_at
+        })
+    
     def cleanup_session(self, session_id: str) -> bool:
         """
         Clean up session resources including files and database records
@@ -275,39 +649,93 @@ class EnhancedSessionManager:
         
         try:
             # Stop simulation if running
-            self.stop_simulation(session_id)
+            if session_info.status not in _TERMINAL_STATUSES:
+                self.stop_simulation(session_id)
             
             # Release port
-            self.port_allocator.release(session_info['traci_port'])
+            self.port_allocator.release(session_info.traci_port)
+            
+            # Let any in-flight file preparation finish before removing its directory
+            session_info.prep_future.exception()
             
             # Clean up files
-            if session_info['session_dir'].exists():
-                shutil.rmtree(session_info['session_dir'], ignore_errors=True)
+            self._discard_dir(session_info.session_dir)
+            
+            # Once removed from memory the database row is the only record of
+            # the session, so queue its final status and write it out first
+            if session_info.status not in _TERMINAL_STATUSES:
+                self._mark_finished(session_info)
+            if self.db_service:
+                self.flush_status_updates()
             
             # Remove from active sessions
             del self.active_sessions[session_id]
+            self._snapshot_dirty = True
             
             return True
             
         except Exception as e:
-            print(f"Error cleaning up session {session_id}: {e}")
+            logger.error("Error cleaning up session %s: %s", session_id, e)
             return False
     
+    def _discard_dir(self, path: Path):
+        """Move a directory to the trash for the background collector to delete"""
+        try:
+            os.rename(path, self._trash / uuid.uuid4().hex)
+        except FileNotFoundError:
+            return
+        except OSError:
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        
+        self._trash_pending += 1
+        if self._trash_pending >= self.trash_max_pending:
+            self._trash_wake.set()
+    
     def get_active_sessions(self) -> List[Dict[str, Any]]:
-        """Get list of all active sessions"""
-        return [
-            {
-                'session_id': session_id,
-                'network_id': info['network_id'],
-                'status': info['status'],
-                'created_at': info['created_at'].isoformat(),
-                'traci_port': info['traci_port']
-            }
-            for session_id, info in self.active_sessions.items()
-        ]
+        """
+        Get list of all active sessions
+        
+        The list is rebuilt only after a session is added, removed or changes
+        status; callers share it and must not modify it or its dicts.
+        
+        A rebuilt list replaces the previous one instead of being edited in
+        place, so when nothing has changed readers return it without locking.
+        """
+        if not self._snapshot_dirty:
+            return self._snapshot
+        
+        with self._snapshot_lock:
+            if self._snapshot_dirty:
+                # Clear the flag first so a change made during the rebuild
+                # triggers another one on the next call
+                self._snapshot_dirty = False
+                self._snapshot = [self._session_view(info) for info in list(self.active_sessions.values())]
+            return self._snapshot
     
-    def _prepare_network_files(self, network_id: str, session_dir: Path, config: Dict[str, Any]) -> Dict[str, str]:
-        """Prepare network files from templates for the session"""
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get one active session in the same form as get_active_sessions(), or None"""
+        info = self.active_sessions.get(session_id)
+        return self._session_view(info) if info else None
+    
+    def _session_view(self, info: SessionInfo) -> Dict[str, Any]:
+        """Public dict describing an active session"""
+        return {
+            'session_id': info.session_id,
+            'network_id': info.network_id,
+            'status': info.status,
+            'created_at': info.created_at.isoformat(),
+            'traci_port': info.traci_port,
+            'error': info.error
+        }
+    
+    def _set_status(self, session_info: SessionInfo, status: str):
+        """Change a session's status and invalidate the get_active_sessions() snapshot"""
+        session_info.status = status
+        self._snapshot_dirty = True
+    
+    def _resolve_network_source(self, network_id: str) -> Path:
+        """Return the template directory for a network, raising if it does not exist"""
         # Handle network_id with or without .net extension
         # Network directories are named without .net extension
         if network_id.endswith('.net'):
@@ -320,25 +748,115 @@ class EnhancedSessionManager:
         if not network_source.exists():
             raise FileNotFoundError(f"Network {network_id} not found at {network_source}")
         
-        # Copy network files to session directory
+        return network_source
+    
+    def _prepare_network_files(self, network_id: str, session_dir: Path, config: Dict[str, Any],
+                               prewarmed: bool = False) -> Dict[str, str]:
+        """Prepare network files from templates for the session"""
+        network_source = self._resolve_network_source(network_id)
+        network_dir_name = network_source.name
+        
+        # Copy network files to session directory, unless it was pre-warmed
+        # with them already
         network_files = {}
-        for file_path in network_source.glob("*"):
-            if file_path.is_file():
-                dest_path = session_dir / file_path.name
-                shutil.copy2(file_path, dest_path)
-                network_files[file_path.suffix] = str(dest_path)
+        sumocfg_file = None
+        for file_path in self._template_files(network_source):
+            dest_path = session_dir / file_path.name
+            if not prewarmed:
+                _clone_file(file_path, dest_path, file_path.name.endswith(_SHAREABLE_TEMPLATE_SUFFIXES))
+            network_files[file_path.suffix] = str(dest_path)
+            if sumocfg_file is None and file_path.suffix == '.sumocfg':
+                sumocfg_file = dest_path
         
         # Modify configuration files based on config
-        self._apply_configuration_to_files(session_dir, network_dir_name, config)
+        self._apply_configuration_to_files(session_dir, network_dir_name, config, sumocfg_file)
         
         return network_files
     
-    def _apply_configuration_to_files(self, session_dir: Path, network_id: str, config: Dict[str, Any]):
+    def _on_prepared(self, session_info: SessionInfo, future: Future):
+        """Mark a session failed, keeping the error, when its file preparation raised"""
+        if future.cancelled() or future.exception() is None or session_info.status != 'created':
+            return
+        session_info.error = f"Failed to prepare network files: {future.exception()}"
+        logger.error("Session %s: %s", session_info.session_id, session_info.error)
+        self._mark_finished(session_info, 'failed')
+    
+    def _template_files(self, network_source: Path) -> List[Path]:
+        """List the files of a network template, re-scanning only when the directory changes"""
+        mtime = network_source.stat().st_mtime
+        entry = self._template_cache.get(network_source.name)
+        if entry is None or entry[0] != mtime:
+            # scandir reports the file type from the directory read, without a stat per entry
+            with os.scandir(network_source) as it:
+                entry = (mtime, [Path(dir_entry.path) for dir_entry in it if dir_entry.is_file()])
+            self._template_cache[network_source.name] = entry
+        return entry[1]
+    
+    def _take_prewarmed(self, network_source: Path, session_dir: Path) -> bool:
+        """Move a pre-cloned template directory to session_dir, if one is ready and current"""
+        ready = self._prewarmed.get(network_source.name)
+        if not ready:
+            return False
+        mtime = network_source.stat().st_mtime
+        while ready:
+            try:
+                template_mtime, prewarmed_dir = ready.popleft()
+            except IndexError:
+                return False
+            if template_mtime == mtime:
+                try:
+                    os.rename(prewarmed_dir, session_dir)
+                    return True
+                except OSError:
+                    pass
+            # Template changed since it was cloned
+            self._discard_dir(prewarmed_dir)
+        return False
+    
+    def _refill_prewarmed(self, network_source: Path):
+        """Top up the pre-cloned directories for a network (runs on the prep pool)"""
+        name = network_source.name
+        # Check and claim under the lock so only one refill per network runs
+        with self._refilling_lock:
+            if name in self._refilling:
+                return
+            self._refilling.add(name)
+        try:
+            ready = self._prewarmed.setdefault(name, deque())
+            while len(ready) < _PREWARM_PER_NETWORK:
+                # Don't fill the temp filesystem with directories nobody asked for yet
+                if shutil.disk_usage(self.temp_dir).free < _PREWARM_MIN_FREE_BYTES:
+                    return
+                mtime = network_source.stat().st_mtime
+                prewarmed_dir = self.temp_dir / f"_prewarm_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+                prewarmed_dir.mkdir()
+                for file_path in self._template_files(network_source):
+                    _clone_file(file_path, prewarmed_dir / file_path.name,
+                                file_path.name.endswith(_SHAREABLE_TEMPLATE_SUFFIXES))
+                ready.append((mtime, prewarmed_dir))
+        except Exception as e:
+            logger.warning("Could not pre-warm session directory for %s: %s", name, e)
+        finally:
+            self._refilling.discard(name)
+    
+    def _remove_stale_prewarmed(self):
+        """Delete pre-cloned directories left behind by earlier processes"""
+        own_prefix = f"_prewarm_{os.getpid()}_"
+        with os.scandir(self.temp_dir) as it:
+            stale = [dir_entry.path for dir_entry in it
+                     if dir_entry.name.startswith('_prewarm_') and not dir_entry.name.startswith(own_prefix)]
+        for path in stale:
+            shutil.rmtree(path, ignore_errors=True)
+    
+    def _apply_configuration_to_files(self, session_dir: Path, network_id: str, config: Dict[str, Any],
+                                      sumocfg_file: Optional[Path] = None):
         """Apply configuration parameters to SUMO files"""
         # Update SUMO config file first
-        sumocfg_files = list(session_dir.glob("*.sumocfg"))
-        if sumocfg_files:
-            self._update_sumo_config(sumocfg_files[0], config)
+        if sumocfg_file is None:
+            with os.scandir(session_dir) as it:
+                sumocfg_file = next((Path(dir_entry.path) for dir_entry in it if dir_entry.name.endswith('.sumocfg')), None)
+        if sumocfg_file is not None:
+            self._update_sumo_config(sumocfg_file, config)
         
         # Apply traffic control configuration to network file
         if config.get('trafficControl') and config['trafficControl'].get('method') != 'existing':
@@ -351,53 +869,24 @@ class EnhancedSessionManager:
     def _update_sumo_config(self, config_file: Path, config: Dict[str, Any]):
         """Update SUMO configuration file with session parameters"""
         try:
-            import xml.etree.ElementTree as ET
-            
-            tree = ET.parse(config_file)
-            root = tree.getroot()
-            
-            # Update timing parameters
-            time_elem = root.find('.//time')
-            if time_elem is None:
-                time_elem = ET.SubElement(root, 'time')
-            
             # Set begin and end times
             begin_time = config.get('sumo_begin', 0)
             end_time = config.get('sumo_end', 3600)
             
-            time_elem.set('begin', str(begin_time))
-            time_elem.set('end', str(end_time))
-            
             # Add Buhos additional file if Buhos method is selected
             traffic_control = config.get('trafficControl', {})
-            if traffic_control.get('method') == 'buhos':
-                input_elem = root.find('.//input')
-                if input_elem is not None:
-                    additional_files_elem = input_elem.find('.//additional-files')
-                    if additional_files_elem is not None:
-                        # Get existing additional files
-                        existing_files = additional_files_elem.get('value', '')
-                        # Add Buhos file to the list
-                        buhos_file = 'buhos_traffic_lights.add.xml'
-                        if buhos_file not in existing_files:
-                            if existing_files:
-                                new_files = f"{existing_files},{buhos_file}"
-                            else:
-                                new_files = buhos_file
-                            additional_files_elem.set('value', new_files)
-                            print(f"Added Buhos additional file to SUMO configuration: {buhos_file}")
-                    else:
-                        # Create additional-files element if it doesn't exist
-                        additional_files_elem = ET.SubElement(input_elem, 'additional-files')
-                        additional_files_elem.set('value', 'buhos_traffic_lights.add.xml')
-                        print(f"Created additional-files element with Buhos file")
+            add_buhos = traffic_control.get('method') == 'buhos'
+            
+            # Sessions of the same network share a template, so the rendered
+            # config is cached on the template bytes and the session parameters
+            rendered = _render_sumo_config(config_file.read_bytes(), str(begin_time), str(end_time), add_buhos)
             
             # Save the updated config
-            tree.write(config_file, encoding='utf-8', xml_declaration=True)
-            print(f"Updated SUMO configuration file: {config_file}")
+            _write_private(config_file, rendered)
+            logger.info("Updated SUMO configuration file: %s", config_file)
             
         except Exception as e:
-            print(f"Error updating SUMO config: {e}")
+            logger.error("Error updating SUMO config: %s", e)
     
     def _apply_traffic_control_configuration(self, session_dir: Path, network_id: str, traffic_control: Dict[str, Any]):
         """Apply traffic control configuration using netconvert"""
@@ -413,52 +902,34 @@ class EnhancedSessionManager:
         # Handle compressed network files
         actual_network_file = network_file if network_file.exists() else network_gz_file
         if not actual_network_file.exists():
-            print(f"Warning: Network file not found: {network_file} or {network_gz_file}")
+            logger.warning("Network file not found: %s or %s", network_file, network_gz_file)
             return
         
         try:
             self._modify_traffic_lights_with_netconvert(actual_network_file, traffic_control)
-            print(f"Successfully applied {method} traffic control to {network_id}")
+            logger.info("Successfully applied %s traffic control to %s", method, network_id)
         except Exception as e:
-            print(f"Error applying traffic control configuration: {e}")
+            logger.error("Error applying traffic control configuration: %s", e)
     
     def _modify_traffic_lights_with_netconvert(self, network_file: Path, config: Dict[str, Any]):
         """Use netconvert to modify traffic lights according to configuration"""
         import subprocess
-        import tempfile
-        import shutil
         
         method = config['method']
         
-        # Create temporary file for output
-        with tempfile.NamedTemporaryFile(suffix='.net.xml', delete=False) as tmp_file:
-            temp_output = Path(tmp_file.name)
+        # Temporary output next to the network file, renamed over it on success.
+        # netconvert reads gzipped networks directly and gzips output whose name
+        # ends in .gz, so compressed networks need no decompress/recompress hops.
+        output_suffix = '.net.xml.gz' if str(network_file).endswith('.gz') else '.net.xml'
+        temp_output = network_file.with_name(f"netconvert_{uuid.uuid4().hex[:8]}{output_suffix}")
         
         try:
-            # Build netconvert command
-            cmd = ['netconvert']
-            
-            # Input file
-            if str(network_file).endswith('.gz'):
-                # For compressed files, we need to decompress first
-                with tempfile.NamedTemporaryFile(suffix='.net.xml', delete=False) as tmp_input:
-                    temp_input = Path(tmp_input.name)
-                
-                # Decompress the network file
-                import gzip
-                with gzip.open(network_file, 'rb') as f_in:
-                    with open(temp_input, 'wb') as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-                
-                cmd.extend(['-s', str(temp_input)])
-            else:
-                cmd.extend(['-s', str(network_file)])
-            
-            cmd.extend(['-o', str(temp_output)])
+            # netconvert options for the traffic control method
+            options = []
             
             # Apply configuration based on method
             if method == 'fixed':
-                cmd.extend([
+                options.extend([
                     '--tls.rebuild',  # Rebuild all traffic light programs
                     '--tls.default-type', 'static',
                     '--tls.cycle.time', str(config.get('cycleTime', 90))
@@ -466,7 +937,7 @@ class EnhancedSessionManager:
             
             elif method == 'adaptive':
                 adaptive_settings = config.get('adaptiveSettings', {})
-                cmd.extend([
+                options.extend([
                     '--tls.rebuild',  # Rebuild all traffic light programs
                     '--tls.default-type', 'actuated',
                     '--tls.min-dur', str(adaptive_settings.get('minDuration', 5)),
@@ -483,7 +954,7 @@ class EnhancedSessionManager:
                 adaptive_settings = config.get('adaptiveSettings', {})
                 speed_threshold_ms = adaptive_settings.get('speedThreshold', 50) * 0.277778  # km/h to m/s
                 
-                cmd.extend([
+                options.extend([
                     '--tls.guess',  # Guess where to add traffic lights
                     '--tls.guess.threshold', str(speed_threshold_ms * 5),  # SUMO uses sum of speeds
                     '--tls.default-type', 'actuated',
@@ -512,37 +983,50 @@ class EnhancedSessionManager:
                 
                 # We still run netconvert but just to process the network
                 # The additional file will be loaded separately
-                print(f"Buhos Method: Created additional file with {buhos_settings.get('phaseDuration', 600)}s phases")
+                logger.info("Buhos Method: Created additional file with %ss phases", buhos_settings.get('phaseDuration', 600))
                 
                 # Don't rebuild traffic lights - keep existing structure
                 # The additional file will override with Buhos programs
             
             # Execute netconvert only if we need to modify the network
             if method != 'buhos':
-                print(f"Running netconvert with command: {' '.join(cmd)}")
+                # Sessions with the same network and settings get the same result,
+                # so reuse an earlier conversion instead of running netconvert again
+                cache_file = self._netconvert_cache_file(network_file, options)
+                if cache_file.exists():
+                    # Mark it recently used for _prune_netconvert_cache
+                    os.utime(cache_file)
+                    temp_copy = network_file.with_name(network_file.name + '.tmp')
+                    _clone_file(cache_file, temp_copy, allow_link=True)
+                    os.replace(temp_copy, network_file)
+                    logger.info("Reused cached netconvert output for %s traffic control configuration", method)
+                    return
+                
+                # Build netconvert command
+                cmd = ['netconvert', '-s', str(network_file), '-o', str(temp_output)]
+                cmd.extend(options)
+                
+                logger.debug("Running netconvert with command: %s", cmd)
                 result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
                 
                 if result.returncode != 0:
-                    print(f"netconvert stderr: {result.stderr}")
+                    logger.error("netconvert stderr: %s", result.stderr)
                     raise Exception(f"netconvert failed with return code {result.returncode}: {result.stderr}")
                 
-                # Replace original file with modified version
-                if str(network_file).endswith('.gz'):
-                    # Compress the output and replace
-                    with open(temp_output, 'rb') as f_in:
-                        with gzip.open(network_file, 'wb') as f_out:
-                            shutil.copyfileobj(f_in, f_out)
-                            
-                    # Clean up temporary input file
-                    if 'temp_input' in locals():
-                        temp_input.unlink()
-                else:
-                    shutil.move(str(temp_output), str(network_file))
+                # Replace original file with modified version; renaming keeps
+                # a hard-linked template from ever being written
+                os.replace(temp_output, network_file)
                 
-                print(f"Successfully applied {method} traffic control configuration")
+                # Keep the result for later sessions
+                temp_cache = cache_file.with_name(f"{cache_file.name}.{uuid.uuid4().hex[:8]}.tmp")
+                _clone_file(network_file, temp_cache, allow_link=True)
+                os.replace(temp_cache, cache_file)
+                self._prune_netconvert_cache()
+                
+                logger.info("Successfully applied %s traffic control configuration", method)
             else:
                 # For Buhos, we don't need to modify the network file
-                print(f"Buhos Method: Network file unchanged, using additional file for traffic light override")
+                logger.info("Buhos Method: Network file unchanged, using additional file for traffic light override")
             
         except subprocess.TimeoutExpired:
             raise Exception("netconvert operation timed out")
@@ -555,6 +1039,38 @@ class EnhancedSessionManager:
             if temp_output.exists():
                 temp_output.unlink()
     
+    def _netconvert_cache_file(self, network_file: Path, options: List[str]) -> Path:
+        """
+        Path of the cached netconvert output for a network file and option list
+        
+        The file's contents are hashed only the first time a given name, size
+        and mtime is seen; session copies of a template keep all three.
+        """
+        st = network_file.stat()
+        key = (network_file.name, st.st_size, st.st_mtime_ns)
+        content_digest = self._network_digests.get(key)
+        if content_digest is None:
+            content_digest = hashlib.sha256(network_file.read_bytes()).hexdigest()
+            self._network_digests[key] = content_digest
+        
+        digest = hashlib.sha256(content_digest.encode())
+        digest.update('\0'.join(options).encode())
+        suffix = '.net.xml.gz' if str(network_file).endswith('.gz') else '.net.xml'
+        return self.netconvert_cache_dir / f"{digest.hexdigest()}{suffix}"
+    
+    def _prune_netconvert_cache(self):
+        """Delete the least recently used cached conversions beyond _NETCONVERT_CACHE_MAX_FILES"""
+        with os.scandir(self.netconvert_cache_dir) as it:
+            entries = [dir_entry for dir_entry in it if dir_entry.is_file() and not dir_entry.name.endswith('.tmp')]
+        if len(entries) <= _NETCONVERT_CACHE_MAX_FILES:
+            return
+        entries.sort(key=lambda dir_entry: dir_entry.stat().st_mtime_ns)
+        for dir_entry in entries[:-_NETCONVERT_CACHE_MAX_FILES]:
+            try:
+                os.unlink(dir_entry.path)
+            except OSError:
+                pass  # Already pruned by another session
+    
     def _create_actuated_additional_file(self, session_dir: Path, adaptive_settings: Dict[str, Any]):
         """Create additional file with actuated traffic light parameters"""
         additional_file = session_dir / "traffic_lights.add.xml"
@@ -578,82 +1094,96 @@ class EnhancedSessionManager:
 </additional>'''
         
         try:
-            additional_file.write_text(content)
-            print(f"Created actuated traffic light parameters file: {additional_file}")
+            _write_private(additional_file, content.encode())
+            logger.info("Created actuated traffic light parameters file: %s", additional_file)
         except Exception as e:
-            print(f"Warning: Could not create additional file: {e}")
+            logger.warning("Could not create additional file: %s", e)
     
     def _extract_tls_info_from_network(self, network_file: Path) -> List[Dict[str, Any]]:
         """
         Extract traffic light information from network file
         
+        Results are cached per network file name and reused while the file's
+        mtime and size are unchanged; session copies of a template keep both,
+        so only the first session on a network parses it. Callers must not
+        mutate the returned list.
+        
         Returns:
             List of dictionaries containing TLS ID and phase information
         """
-        import xml.etree.ElementTree as ET
         import gzip
         
         try:
-            # Read network file (handle both compressed and uncompressed)
-            if str(network_file).endswith('.gz'):
-                with gzip.open(network_file, 'rt', encoding='utf-8') as f:
-                    content = f.read()
-            else:
-                with open(network_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
+            st = network_file.stat()
+            stamp = (st.st_mtime_ns, st.st_size)
+            entry = self._tls_info_cache.get(network_file.name)
+            if entry is not None and entry[:2] == stamp:
+                return entry[2]
             
-            root = ET.fromstring(content)
+            # Stream the network file (handle both compressed and uncompressed)
+            opener = gzip.open if str(network_file).endswith('.gz') else open
             tls_info_list = []
             
-            # Find all traffic light logics
-            for tl_logic in root.findall('.//tlLogic'):
-                tls_id = tl_logic.get('id')
-                tls_type = tl_logic.get('type', 'static')
-                program_id = tl_logic.get('programID', '0')
-                
-                # Get phases
-                phases = []
-                for phase in tl_logic.findall('.//phase'):
-                    phase_info = {
-                        'duration': phase.get('duration'),
-                        'state': phase.get('state'),
-                        'name': phase.get('name', '')
-                    }
-                    phases.append(phase_info)
-                
-                tls_info = {
-                    'id': tls_id,
-                    'type': tls_type,
-                    'programID': program_id,
-                    'phases': phases,
-                    'num_phases': len(phases),
-                    'state_length': len(phases[0]['state']) if phases else 0
-                }
-                tls_info_list.append(tls_info)
-            
-            print(f"Found {len(tls_info_list)} traffic light(s) in network")
+            with opener(network_file, 'rb') as source:
+                depth = 0
+                for event, elem in ET.iterparse(source, events=('start', 'end')):
+                    if event == 'start':
+                        depth += 1
+                        continue
+                    depth -= 1
+                    
+                    # Find all traffic light logics
+                    if elem.tag == 'tlLogic':
+                        tls_info_list.append(self._tls_info(elem))
+                    
+                    # Drop each finished top-level element so memory stays bounded
+                    if depth == 1:
+                        elem.clear()
+            
+            logger.info("Found %d traffic light(s) in network", len(tls_info_list))
             for tls in tls_info_list:
-                print(f"  - TLS '{tls['id']}': {tls['num_phases']} phases, {tls['state_length']} connections")
+                logger.debug("  - TLS '%s': %d phases, %d connections", tls['id'], tls['num_phases'], tls['state_length'])
+            
+            self._tls_info_cache[network_file.name] = (st.st_mtime_ns, st.st_size, tls_info_list)
             
             return tls_info_list
             
         except Exception as e:
-            print(f"Warning: Could not extract TLS info from network: {e}")
+            logger.warning("Could not extract TLS info from network: %s", e)
             return []
     
+    def _tls_info(self, tl_logic) -> Dict[str, Any]:
+        """Summarize a tlLogic element as its ID, type and phases"""
+        # Get phases
+        phases = []
+        for phase in tl_logic.findall('.//phase'):
+            phase_info = {
+                'duration': phase.get('duration'),
+                'state': phase.get('state'),
+                'name': phase.get('name', '')
+            }
+            phases.append(phase_info)
+        
+        return {
+            'id': tl_logic.get('id'),
+            'type': tl_logic.get('type', 'static'),
+            'programID': tl_logic.get('programID', '0'),
+            'phases': phases,
+            'num_phases': len(phases),
+            'state_length': len(phases[0]['state']) if phases else 0
+        }
+    
     def _create_buhos_additional_file(self, session_dir: Path, network_file: Path, buhos_settings: Dict[str, Any]):
         """
         Create additional file with Buhos Method traffic light programs
         
         This creates extremely long green phases for each direction sequentially
         """
-        import xml.etree.ElementTree as ET
-        
         # Extract traffic light information from network
         tls_info_list = self._extract_tls_info_from_network(network_file)
         
         if not tls_info_list:
-            print("Warning: No traffic lights found in network - Buhos method will not be applied")
+            logger.warning("No traffic lights found in network - Buhos method will not be applied")
             return
         
         # Get Buhos settings
@@ -664,20 +1194,36 @@ class EnhancedSessionManager:
         # Create additional file
         additional_file = session_dir / "buhos_traffic_lights.add.xml"
         
-        # Build XML content
-        root = ET.Element('additional')
-        root.set('xmlns:xsi', 'http://www.w3.org/2001/XMLSchema-instance')
-        root.set('xsi:noNamespaceSchemaLocation', 'http://sumo.dlr.de/xsd/additional_file.xsd')
+        # Determine phase order
+        if phase_order == 'NS-EW':
+            first_name, second_name = 'NS_Buhos', 'EW_Buhos'
+        else:  # EW-NS
+            first_name, second_name = 'EW_Buhos', 'NS_Buhos'
         
-        # Add comment
-        comment = ET.Comment(f'''
-        Buhos Method Traffic Light Programs
-        - Phase Duration: {phase_duration}s ({phase_duration/60:.1f} minutes) per direction
-        - All-Red Time: {all_red_time}s clearance between phases
-        - Phase Order: {phase_order}
-        - Total Cycle: {(phase_duration * 2 + all_red_time * 4)}s (~{(phase_duration * 2 + all_red_time * 4)/60:.1f} minutes)
-        ''')
-        root.append(comment)
+        parts = [_BUHOS_HEADER.format(
+            phase_duration=phase_duration,
+            phase_minutes=phase_duration / 60,
+            all_red_time=all_red_time,
+            phase_order=phase_order,
+            cycle=phase_duration * 2 + all_red_time * 4,
+            cycle_minutes=(phase_duration * 2 + all_red_time * 4) / 60
+        )]
+        
+        # Signal runs as long as the widest traffic light; each state string
+        # below is built by slicing these instead of repeating characters per TLS
+        max_length = max(tls_info['state_length'] for tls_info in tls_info_list)
+        green_run = 'G' * max_length
+        yellow_run = 'y' * max_length
+        red_run = 'r' * max_length
+        
+        # Values shared by every program
+        duration = _xml_attr(str(phase_duration))
+        red_duration = _xml_attr(str(all_red_time))
+        
+        # The states only depend on the signal length, which most traffic
+        # lights in a network share: state_length -> (first green, first
+        # yellow, second green, second yellow, all red)
+        states_by_length: Dict[int, tuple] = {}
         
         # Create Buhos program for each traffic light
         for tls_info in tls_info_list:
@@ -685,202 +1231,297 @@ class EnhancedSessionManager:
             state_length = tls_info['state_length']
             
             if state_length == 0:
-                print(f"Warning: TLS '{tls_id}' has no phases, skipping")
+                logger.warning("TLS '%s' has no phases, skipping", tls_id)
                 continue
             
-            # Create Buhos-style states
-            # We need to determine which connections are NS and which are EW
-            # For simplicity, we'll split the state string roughly in half
-            half_point = state_length // 2
-            
-            # Create state patterns for Buhos method
-            # North-South green: First half green, second half red
-            ns_green_state = 'G' * half_point + 'r' * (state_length - half_point)
-            ns_yellow_state = 'y' * half_point + 'r' * (state_length - half_point)
-            
-            # East-West green: First half red, second half green
-            ew_green_state = 'r' * half_point + 'G' * (state_length - half_point)
-            ew_yellow_state = 'r' * half_point + 'y' * (state_length - half_point)
-            
-            # All red state
-            all_red_state = 'r' * state_length
-            
-            # Create tlLogic element
-            tl_logic = ET.SubElement(root, 'tlLogic')
-            tl_logic.set('id', tls_id)
-            tl_logic.set('type', 'static')
-            tl_logic.set('programID', 'buhos')
-            tl_logic.set('offset', '0')
-            
-            # Determine phase order
-            if phase_order == 'NS-EW':
-                first_green = ns_green_state
-                first_yellow = ns_yellow_state
-                first_name = 'NS_Buhos'
-                second_green = ew_green_state
-                second_yellow = ew_yellow_state
-                second_name = 'EW_Buhos'
-            else:  # EW-NS
-                first_green = ew_green_state
-                first_yellow = ew_yellow_state
-                first_name = 'EW_Buhos'
-                second_green = ns_green_state
-                second_yellow = ns_yellow_state
-                second_name = 'NS_Buhos'
-            
-            # Phase 1: First direction BUHOS (long green)
-            phase1 = ET.SubElement(tl_logic, 'phase')
-            phase1.set('duration', str(phase_duration))
-            phase1.set('state', first_green)
-            phase1.set('name', first_name)
-            
-            # Phase 2: First direction yellow
-            phase2 = ET.SubElement(tl_logic, 'phase')
-            phase2.set('duration', '5')
-            phase2.set('state', first_yellow)
-            phase2.set('name', f'{first_name}_Yellow')
-            
-            # Phase 3: All red clearance
-            phase3 = ET.SubElement(tl_logic, 'phase')
-            phase3.set('duration', str(all_red_time))
-            phase3.set('state', all_red_state)
-            phase3.set('name', 'All_Red_1')
-            
-            # Phase 4: Second direction BUHOS (long green)
-            phase4 = ET.SubElement(tl_logic, 'phase')
-            phase4.set('duration', str(phase_duration))
-            phase4.set('state', second_green)
-            phase4.set('name', second_name)
-            
-            # Phase 5: Second direction yellow
-            phase5 = ET.SubElement(tl_logic, 'phase')
-            phase5.set('duration', '5')
-            phase5.set('state', second_yellow)
-            phase5.set('name', f'{second_name}_Yellow')
-            
-            # Phase 6: All red clearance
-            phase6 = ET.SubElement(tl_logic, 'phase')
-            phase6.set('duration', str(all_red_time))
-            phase6.set('state', all_red_state)
-            phase6.set('name', 'All_Red_2')
-            
-            print(f"Created Buhos program for TLS '{tls_id}': {phase_duration}s per direction")
-        
-        # Write XML to file with pretty printing
-        tree = ET.ElementTree(root)
-        ET.indent(tree, space='  ')
-        tree.write(additional_file, encoding='utf-8', xml_declaration=True)
-        
-        print(f"Created Buhos traffic light programs file: {additional_file}")
-        print(f"  - Cycle time: {(phase_duration * 2 + all_red_time * 2 + 10)}s (~{(phase_duration * 2 + all_red_time * 2 + 10)/60:.1f} minutes)")
-        print(f"  - Each direction gets {phase_duration}s ({phase_duration/60:.1f} minutes) of continuous green")
+            states = states_by_length.get(state_length)
+            if states is None:
+                # Create Buhos-style states
+                # We need to determine which connections are NS and which are EW
+                # For simplicity, we'll split the state string roughly in half
+                half_point = state_length // 2
+                rest = state_length - half_point
+                
+                # Create state patterns for Buhos method
+                # North-South green: First half green, second half red
+                ns_green_state = green_run[:half_point] + red_run[:rest]
+                ns_yellow_state = yellow_run[:half_point] + red_run[:rest]
+                
+                # East-West green: First half red, second half green
+                ew_green_state = red_run[:half_point] + green_run[:rest]
+                ew_yellow_state = red_run[:half_point] + yellow_run[:rest]
+                
+                if phase_order == 'NS-EW':
+                    states = (ns_green_state, ns_yellow_state, ew_green_state, ew_yellow_state)
+                else:  # EW-NS
+                    states = (ew_green_state, ew_yellow_state, ns_green_state, ns_yellow_state)
+                states += (red_run[:state_length],)
+                states_by_length[state_length] = states
+            first_green, first_yellow, second_green, second_yellow, all_red_state = states
+            
+            # Green, yellow and all-red clearance for each direction in turn
+            parts.append(_BUHOS_TLS_TEMPLATE.format(
+                id=_xml_attr(tls_id),
+                duration=duration,
+                red_duration=red_duration,
+                first_green=first_green,
+                first_yellow=first_yellow,
+                first_name=first_name,
+                second_green=second_green,
+                second_yellow=second_yellow,
+                second_name=second_name,
+                all_red=all_red_state
+            ))
+            
+            logger.debug("Created Buhos program for TLS '%s': %ss per direction", tls_id, phase_duration)
+        
+        parts.append(_BUHOS_FOOTER)
+        _write_private(additional_file, ''.join(parts).encode())
+        
+        logger.info("Created Buhos traffic light programs file: %s", additional_file)
+        logger.info("  - Cycle time: %ss (~%.1f minutes)", phase_duration * 2 + all_red_time * 2 + 10, (phase_duration * 2 + all_red_time * 2 + 10) / 60)
+        logger.info("  - Each direction gets %ss (%.1f minutes) of continuous green", phase_duration, phase_duration / 60)
     
     def _update_vehicle_types(self, session_dir: Path, enabled_vehicles: List[str]):
         """Update vehicle type configuration"""
         # This would integrate with existing vehicle type logic
         # For now, just log the enabled vehicles
-        print(f"Enabled vehicles for session: {enabled_vehicles}")
+        logger.info("Enabled vehicles for session: %s", enabled_vehicles)
     
-    def _build_sumo_command(self, session_info: Dict[str, Any]) -> List[str]:
+    def _build_sumo_command(self, session_info: SessionInfo) -> List[str]:
         """Build SUMO command line based on session configuration"""
-        config = session_info['config']
+        config = session_info.config
         
-        # Base command
-        sumo_path = "C:\\Program Files (x86)\\Eclipse\\Sumo\\bin"
-        if session_info['enable_gui']:
-            cmd = [os.path.join(sumo_path, "sumo-gui.exe")]
-        else:
-            cmd = [os.path.join(sumo_path, "sumo.exe")]
+        # Configuration file, known from the prepared network files
+        sumocfg_path = (session_info.network_files or {}).get('.sumocfg')
+        if sumocfg_path is None:
+            sumocfg_path = next(session_info.session_dir.glob("*.sumocfg"), None)
+        sumocfg_name = os.path.basename(sumocfg_path) if sumocfg_path else None
         
-        # Configuration file
-        sumocfg_files = list(session_info['session_dir'].glob("*.sumocfg"))
-        if sumocfg_files:
-            cmd.extend(["-c", sumocfg_files[0].name])
+        # Binary, config file and constant flags are the same for every launch
+        prefix = _sumo_command_prefix(
+            self._sumo_bin_dir, self._launch_env['PATH'], session_info.enable_gui, sumocfg_name
+        )
         
-        # TraCI port
-        cmd.extend(["--remote-port", str(session_info['traci_port'])])
+        # TraCI port, plus the traffic scale when it is not the default
+        traffic_scale = config['traffic_scale']  # See _normalize_config
+        if traffic_scale != 1.0:
+            return [*prefix, "--remote-port", str(session_info.traci_port), "--scale", str(traffic_scale)]
+        return [*prefix, "--remote-port", str(session_info.traci_port)]
+    
+    def _collect_live_data(self, session_id: str):
+        """TraCI data collection has been disabled - method kept for compatibility, no longer started"""
+        return
+    
+    def _watch_process(self, session_id: str, process: subprocess.Popen):
+        """Block until the SUMO process exits, then clean up if it ended on its own"""
+        try:
+            process.wait()
+        except Exception as e:
+            logger.error("Error waiting for SUMO process of session %s: %s", session_id, e)
+            return
         
-        # Other parameters
-        cmd.extend([
-            "--time-to-teleport", "300",
-            "--no-warnings"
-        ])
+        session_info = self.active_sessions.get(session_id)
+        if session_info and session_info.process is process and session_info.status == 'running':
+            # cleanup_session stops the session, which records its completion
+            logger.info("SUMO process exited for session %s, cleaning up", session_id)
+            self.cleanup_session(session_id)
+    
+    def _queue_update(self, session_id: str, fields: Dict[str, Any]):
+        """Queue session row fields for the status flusher, merging with any pending ones"""
+        if not self.db_service:
+            return
+        with self._pending_lock:
+            self._pending_updates.setdefault(session_id, {}).update(fields)
+    
+    def flush_status_updates(self):
+        """
+        Write all queued session row updates in one transaction
         
-        traffic_scale = config.get('sumo_traffic_scale', config.get('traffic_scale', config.get('sumo_traffic_intensity', 1.0)))  # Legacy fallback
-        if traffic_scale != 1.0:
-            cmd.extend(["--scale", str(traffic_scale)])
+        A batch that fails to write is queued again, so no update is lost.
+        """
+        with self._pending_lock:
+            if not self._pending_updates:
+                return
+            updates, self._pending_updates = self._pending_updates, {}
+        try:
+            written = self.db_service.update_sessions(updates)
+        except Exception as e:
+            logger.error("Error writing session updates: %s", e)
+            written = False
+        if not written:
+            # Queue the batch again for the next flush; updates queued in the
+            # meantime are newer, so they win
+            with self._pending_lock:
+                for session_id, fields in updates.items():
+                    self._pending_updates[session_id] = {**fields, **self._pending_updates.get(session_id, {})}
+            logger.warning("Re-queued %d session update(s) after a failed write", len(updates))
+    
+    def shutdown(self, grace: float = 5.0):
+        """
+        Stop all sessions and the background threads, then write pending updates
         
-        if not session_info['enable_gui']:
-            cmd.extend(["--quit-on-end", "--start"])
-        else:
-            cmd.extend(["--start", "--game"])
+        Threads waiting on a timer or for the next session expiry are woken
+        immediately instead of finishing their current sleep.
+        """
+        self.stop_all(grace=grace)
+        
+        self._shutdown.set()
+        with self._heap_changed:
+            self._heap_changed.notify_all()
+        self._trash_wake.set()
+        self._prep_pool.shutdown(wait=False, cancel_futures=True)
         
-        return cmd
+        if self.db_service:
+            self.flush_status_updates()
     
-    def _collect_live_data(self, session_id: str):
-        """TraCI data collection has been disabled - method kept for compatibility"""
-        print(f"Live data collection disabled for session {session_id} - running in pure GUI mode")
-        return
+    def _start_status_flusher(self):
+        """Start background thread that writes queued session updates"""
+        def flush_status_updates():
+            while not self._shutdown.wait(self._flush_interval):
+                try:
+                    self.flush_status_updates()
+                except Exception as e:
+                    logger.error("Error in status flusher: %s", e)
+        
+        flusher_thread = threading.Thread(target=flush_status_updates, daemon=True)
+        flusher_thread.start()
+        atexit.register(self.flush_status_updates)
     
     def _start_cleanup_thread(self):
         """Start background thread for session cleanup"""
         def cleanup_expired_sessions():
-            while True:
+            while not self._shutdown.is_set():
                 try:
-                    current_time = datetime.now()
                     sessions_to_cleanup = []
                     
-                    for session_id, session_info in self.active_sessions.items():
-                        # Check if session has timed out
-                        age = current_time - session_info['created_at']
-                        if age > timedelta(seconds=self.session_timeout):
-                            sessions_to_cleanup.append(session_id)
+                    # Only the head of the heap needs checking; process exits are
+                    # handled by the per-session watcher threads
+                    with self._heap_changed:
+                        # Sleep until the earliest expiry, or indefinitely when idle
+                        while True:
+                            if self._shutdown.is_set():
+                                return
+                            current_time = time.monotonic()
+                            if self._expiry_heap and self._expiry_heap[0][0] <= current_time:
+                                break
+                            timeout = self._expiry_heap[0][0] - current_time if self._expiry_heap else None
+                            self._heap_changed.wait(timeout)
                         
-                        # Check if process has died
-                        if session_info['process'] and session_info['process'].poll() is not None:
-                            if session_info['status'] == 'running':
-                                session_info['status'] = 'completed'
+                        while self._expiry_heap and self._expiry_heap[0][0] <= current_time:
+                            _, session_id = heapq.heappop(self._expiry_heap)
+                            if session_id in self.active_sessions:
                                 sessions_to_cleanup.append(session_id)
                     
-                    # Cleanup expired sessions
+                    # Cleanup expired sessions; ones never launched are recorded
+                    # as expired, running ones complete when they are stopped
                     for session_id in sessions_to_cleanup:
-                        print(f"Cleaning up expired session: {session_id}")
+                        logger.info("Cleaning up expired session: %s", session_id)
+                        session_info = self.active_sessions.get(session_id)
+                        if session_info is not None and session_info.status == 'created':
+                            self._mark_finished(session_info, 'expired')
                         self.cleanup_session(session_id)
                     
-                    time.sleep(self.cleanup_interval)
-                    
                 except Exception as e:
-                    print(f"Error in cleanup thread: {e}")
-                    time.sleep(self.cleanup_interval)
+                    logger.error("Error in cleanup thread: %s", e)
+                    self._shutdown.wait(self.cleanup_interval)
         
         cleanup_thread = threading.Thread(target=cleanup_expired_sessions, daemon=True)
         cleanup_thread.start()
+    
+    def _start_trash_collector(self):
+        """Start background thread that deletes trashed session directories"""
+        def collect_trash():
+            while not self._shutdown.is_set():
+                try:
+                    with os.scandir(self._trash) as it:
+                        paths = [dir_entry.path for dir_entry in it]
+                    self._trash_pending = 0
+                    self._trash_wake.clear()
+                    
+                    for i in range(0, len(paths), self.trash_batch_size):
+                        if i and self._shutdown.wait(self.trash_batch_pause):
+                            break
+                        for path in paths[i:i + self.trash_batch_size]:
+                            shutil.rmtree(path, ignore_errors=True)
+                except Exception as e:
+                    logger.error("Error in trash collector: %s", e)
+                
+                self._trash_wake.wait(self.trash_interval)
+        
+        trash_thread = threading.Thread(target=collect_trash, daemon=True)
+        trash_thread.start()
 
 
 class PortAllocator:
-    """Manages TraCI port allocation for multiple SUMO instances"""
+    """
+    Manages TraCI port allocation for multiple SUMO instances
+    
+    Each allocated port is held by a bound socket until activate() is called
+    right before SUMO starts, so neither another allocation nor an unrelated
+    process can take it in between; ports that cannot be bound are skipped.
+    On Windows the socket is bound with SO_EXCLUSIVEADDRUSE, since
+    SO_REUSEADDR there lets a socket bind a port that is already in use.
+    
+    No lock is taken: deque.popleft/append, set.add/remove and dict.pop are
+    each atomic under the GIL, and release() only returns a port to the free
+    list when its own remove() succeeds, so a port is never freed twice.
+    """
     
     def __init__(self, start_port: int = 8813, max_ports: int = 100):
         self.start_port = start_port
         self.max_ports = max_ports
         self.allocated_ports: Set[int] = set()
-        self.lock = threading.Lock()
+        # Free list of unallocated ports so allocate/release are O(1)
+        self._free = deque(range(start_port, start_port + max_ports))
+        # port -> socket reserving it until SUMO is launched
+        self._held_sockets: Dict[int, socket.socket] = {}
     
     def allocate(self) -> int:
         """Allocate an available port"""
-        with self.lock:
-            for port in range(self.start_port, self.start_port + self.max_ports):
-                if port not in self.allocated_ports:
-                    self.allocated_ports.add(port)
-                    return port
-            raise RuntimeError("No available ports for TraCI")
+        for _ in range(len(self._free)):
+            try:
+                port = self._free.popleft()
+            except IndexError:
+                break
+            
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            try:
+                if os.name == 'nt':
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+                else:
+                    # Lets the port be reused while connections from a previous
+                    # SUMO on it sit in TIME_WAIT; a port some other socket is
+                    # listening on still fails to bind
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                sock.bind(('', port))
+            except OSError:
+                # In use outside this allocator; try it again later
+                sock.close()
+                self._free.append(port)
+                continue
+            
+            self._held_sockets[port] = sock
+            self.allocated_ports.add(port)
+            return port
+        
+        raise RuntimeError("No available ports for TraCI")
+    
+    def activate(self, port: int):
+        """Stop reserving an allocated port so the process it is for can bind it"""
+        sock = self._held_sockets.pop(port, None)
+        if sock is not None:
+            sock.close()
     
     def release(self, port: int):
         """Release an allocated port"""
-        with self.lock:
-            self.allocated_ports.discard(port)
+        try:
+            self.allocated_ports.remove(port)
+        except KeyError:
+            return  # Not allocated, or already released
+        self.activate(port)
+        self._free.append(port)
     
     def get_allocated_ports(self) -> List[int]:
         """Get list of currently allocated ports"""
-        with self.lock:
-            return list(self.allocated_ports)
+        return list(self.allocated_ports)
@@ -8,9 +8,11 @@ Author: Traffic Simulator Team
 Date: September 2025
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from typing import Dict, Any
 
+from utils.json_response import ojsonify
+
 # This will be integrated into the main app.py
 multi_session_api = Blueprint('multi_session', __name__)
 
@@ -20,18 +22,19 @@ def create_multi_session_endpoints(app, enhanced_session_manager, db_service):
     @app.route('/api/v2/sessions', methods=['POST'])
     def create_session_v2():
         """Create a new simulation session with enhanced management"""
+        # A missing or malformed body is rejected here rather than raising
+        data = request.get_json(silent=True)
+        network_id = data.get('networkId') if isinstance(data, dict) else None
+        if not network_id:
+            return ojsonify({
+                'success': False,
+                'message': 'Network ID is required'
+            }), 400
+        
+        config = data.get('config', {})
+        enable_gui = data.get('enableGui', True)
+        
         try:
-            data = request.get_json()
-            network_id = data.get('networkId')
-            config = data.get('config', {})
-            enable_gui = data.get('enableGui', True)
-            
-            if not network_id:
-                return jsonify({
-                    'success': False,
-                    'message': 'Network ID is required'
-                }), 400
-            
             # Create session using enhanced manager
             result = enhanced_session_manager.create_session(
                 network_id=network_id,
@@ -39,10 +42,10 @@ def create_multi_session_endpoints(app, enhanced_session_manager, db_service):
                 enable_gui=enable_gui
             )
             
-            return jsonify(result)
+            return ojsonify(result)
             
         except Exception as e:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'message': f'Error creating session: {str(e)}'
             }), 500
@@ -52,10 +55,10 @@ def create_multi_session_endpoints(app, enhanced_session_manager, db_service):
         """Launch simulation for specific session"""
         try:
             result = enhanced_session_manager.launch_simulation(session_id)
-            return jsonify(result)
+            return ojsonify(result)
             
         except Exception as e:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'message': f'Error launching session: {str(e)}'
             }), 500
@@ -65,10 +68,10 @@ def create_multi_session_endpoints(app, enhanced_session_manager, db_service):
         """Stop simulation for specific session"""
         try:
             result = enhanced_session_manager.stop_simulation(session_id)
-            return jsonify(result)
+            return ojsonify(result)
             
         except Exception as e:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'message': f'Error stopping session: {str(e)}'
             }), 500
@@ -78,13 +81,13 @@ def create_multi_session_endpoints(app, enhanced_session_manager, db_service):
         """Clean up session resources"""
         try:
             success = enhanced_session_manager.cleanup_session(session_id)
-            return jsonify({
+            return ojsonify({
                 'success': success,
                 'message': f'Session {session_id} cleaned up' if success else 'Cleanup failed'
             })
             
         except Exception as e:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'message': f'Error cleaning up session: {str(e)}'
             }), 500
@@ -95,21 +98,23 @@ def create_multi_session_endpoints(app, enhanced_session_manager, db_service):
         try:
             sessions = enhanced_session_manager.get_active_sessions()
             
-            # Enhance with database information
+            # Enhance with database information; the dicts are shared
+            # snapshot entries, so merge into copies with in-memory fields last
             if db_service:
+                merged = []
                 for session in sessions:
                     db_session = db_service.get_session_by_id(session['session_id'])
-                    if db_session:
-                        session.update(db_session.to_dict())
+                    merged.append({**db_session.to_dict(), **session} if db_session else session)
+                sessions = merged
             
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'sessions': sessions,
                 'total': len(sessions)
             })
             
         except Exception as e:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'message': f'Error retrieving sessions: {str(e)}'
             }), 500
@@ -127,29 +132,29 @@ def create_multi_session_endpoints(app, enhanced_session_manager, db_service):
                 if db_service:
                     db_session = db_service.get_session_by_id(session_id)
                     if db_session:
-                        return jsonify({
+                        return ojsonify({
                             'success': True,
                             'session': db_session.to_dict()
                         })
                 
-                return jsonify({
+                return ojsonify({
                     'success': False,
                     'message': f'Session {session_id} not found'
                 }), 404
             
-            # Enhance with database information
+            # Enhance with database information; in-memory fields are newer
             if db_service:
                 db_session = db_service.get_session_by_id(session_id)
                 if db_session:
-                    session_info.update(db_session.to_dict())
+                    session_info = {**db_session.to_dict(), **session_info}
             
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'session': session_info
             })
             
         except Exception as e:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'message': f'Error retrieving session status: {str(e)}'
             }), 500
@@ -159,7 +164,7 @@ def create_multi_session_endpoints(app, enhanced_session_manager, db_service):
         """Get live data for specific session"""
         try:
             if not db_service:
-                return jsonify({
+                return ojsonify({
                     'success': False,
                     'message': 'Database service not available'
                 }), 500
@@ -167,14 +172,14 @@ def create_multi_session_endpoints(app, enhanced_session_manager, db_service):
             # Get latest live data from database
             live_data = db_service.get_latest_live_data(session_id, limit=100)
             
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'session_id': session_id,
-                'data': [data.to_dict() for data in live_data]
+                'data': live_data
             })
             
         except Exception as e:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'message': f'Error retrieving live data: {str(e)}'
             }), 500
@@ -186,7 +191,7 @@ def create_multi_session_endpoints(app, enhanced_session_manager, db_service):
             active_sessions = enhanced_session_manager.get_active_sessions()
             allocated_ports = enhanced_session_manager.port_allocator.get_allocated_ports()
             
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'resource_usage': {
                     'active_sessions': len(active_sessions),
@@ -197,7 +202,7 @@ def create_multi_session_endpoints(app, enhanced_session_manager, db_service):
             })
             
         except Exception as e:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'message': f'Error retrieving resource usage: {str(e)}'
             }), 500
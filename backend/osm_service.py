@@ -12,7 +12,9 @@ Date: October 2025
 import os
 import sys
 import json
+import select
 import shutil
+import socket
 import subprocess
 import time
 import signal
@@ -59,6 +61,9 @@ class OSMService:
         self.wizard_port = 8010
         self.wizard_url = f"http://localhost:{self.wizard_port}"
         
+        # SUMO tools directory, once found by get_sumo_tools_path
+        self._sumo_tools_path: Optional[Path] = None
+        
         # Ensure directories exist
         self.osm_scenarios_dir.mkdir(parents=True, exist_ok=True)
         self.target_networks_dir.mkdir(parents=True, exist_ok=True)
@@ -73,9 +78,18 @@ class OSMService:
         """
         Find SUMO tools directory from environment or common locations
         
+        The first directory found is remembered; a miss is not, so SUMO
+        installed after startup is still picked up.
+        
         Returns:
             Path to SUMO tools directory or None if not found
         """
+        if self._sumo_tools_path is None:
+            self._sumo_tools_path = self._find_sumo_tools_path()
+        return self._sumo_tools_path
+    
+    def _find_sumo_tools_path(self) -> Optional[Path]:
+        """Search SUMO_HOME and common install locations for the tools directory"""
         # Check SUMO_HOME environment variable
         sumo_home = os.environ.get('SUMO_HOME')
         if sumo_home:
@@ -155,8 +169,8 @@ class OSMService:
                 creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == 'nt' else 0
             )
             
-            # Wait a moment for the process to start
-            time.sleep(2)
+            # Wait for the process to start serving (or to fail)
+            self._wait_for_wizard_start(timeout=2.0)
             
             # Check if process is still running
             if self.wizard_process.poll() is not None:
@@ -198,17 +212,59 @@ class OSMService:
                 return True
             
             # Check if any process is listening on the wizard port
-            import socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(1)
-            result = sock.connect_ex(('localhost', self.wizard_port))
-            sock.close()
-            
-            return result == 0
+            return self._wizard_port_open(timeout=1)
             
         except Exception:
             return False
     
+    def _wizard_port_open(self, timeout: float) -> bool:
+        """Check whether something accepts connections on the wizard port"""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            return sock.connect_ex(('localhost', self.wizard_port)) == 0
+    
+    def _wait_for_wizard_start(self, timeout: float):
+        """
+        Wait until the wizard process exits or its port accepts connections
+        
+        Returns as soon as either happens, or after timeout seconds. On Linux
+        the process exit is waited for on a pidfd; elsewhere the process is
+        polled in short slices.
+        """
+        process = self.wizard_process
+        pidfd = None
+        if hasattr(os, 'pidfd_open'):
+            try:
+                pidfd = os.pidfd_open(process.pid)
+            except OSError:
+                pidfd = None  # Kernel without pidfd support
+        
+        try:
+            poller = None
+            if pidfd is not None:
+                poller = select.poll()
+                poller.register(pidfd, select.POLLIN)
+            
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                slice_seconds = min(remaining, 0.05)
+                if poller is not None:
+                    if poller.poll(slice_seconds * 1000):
+                        return  # Process exited
+                else:
+                    if process.poll() is not None:
+                        return
+                    time.sleep(slice_seconds)
+                
+                if self._wizard_port_open(timeout=slice_seconds):
+                    return
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+    
     def stop_wizard(self) -> Dict[str, Any]:
         """
         Stop the OSM Web Wizard process
@@ -278,20 +334,19 @@ class OSMService:
         try:
             scenarios = []
             
-            # Look for timestamped directories (OSM Web Wizard format: YYYY-MM-DD-HH-MM-SS)
-            for item in self.osm_scenarios_dir.iterdir():
-                if not item.is_dir():
-                    continue
-                
-                # Skip processed directory
-                if item.name == "processed":
-                    continue
-                
-                # Check if this looks like an OSM Web Wizard timestamp
-                if self._is_osm_timestamp_format(item.name):
-                    scenario_info = self._analyze_scenario_folder(item)
-                    if scenario_info:
-                        scenarios.append(scenario_info)
+            # Look for timestamped directories (OSM Web Wizard format: YYYY-MM-DD-HH-MM-SS);
+            # scandir reports entry types from the directory read, without a stat each
+            with os.scandir(self.osm_scenarios_dir) as it:
+                for entry in it:
+                    # Skip processed and hidden directories
+                    if entry.name == "processed" or entry.name.startswith('.'):
+                        continue
+                    
+                    # Check if this looks like an OSM Web Wizard timestamp
+                    if self._is_osm_timestamp_format(entry.name) and entry.is_dir():
+                        scenario_info = self._analyze_scenario_folder(Path(entry.path))
+                        if scenario_info:
+                            scenarios.append(scenario_info)
             
             # Sort by creation time (newest first)
             scenarios.sort(key=lambda x: x['created_at'], reverse=True)
@@ -346,13 +401,17 @@ class OSMService:
             stat = folder_path.stat()
             created_at = datetime.fromtimestamp(stat.st_ctime)
             
-            # Count files
-            files = list(folder_path.glob('*'))
-            file_count = len([f for f in files if f.is_file()])
+            # One directory read; scandir reports entry types without a stat each.
+            # Hidden entries (.DS_Store, editor swap files) are not scenario files
+            with os.scandir(folder_path) as it:
+                entries = [entry for entry in it if not entry.name.startswith('.')]
+            names = [entry.name for entry in entries]
+            files = [entry for entry in entries if entry.is_file()]
+            file_count = len(files)
             
             # Check for required OSM Web Wizard files
-            has_network = any(f.name.endswith('.net.xml') or f.name.endswith('.net.xml.gz') for f in files)
-            has_config = any(f.name.endswith('.sumocfg') for f in files)
+            has_network = any(name.endswith(('.net.xml', '.net.xml.gz')) for name in names)
+            has_config = any(name.endswith('.sumocfg') for name in names)
             
             if not (has_network and has_config):
                 return None  # Not a valid OSM scenario
@@ -361,7 +420,7 @@ class OSMService:
             vehicle_types = []
             route_patterns = ['.passenger.', '.bus.', '.truck.', '.motorcycle.']
             for pattern in route_patterns:
-                if any(pattern in f.name for f in files):
+                if any(pattern in name for name in names):
                     vehicle_type = pattern.strip('.')
                     vehicle_types.append(vehicle_type)
             
@@ -387,7 +446,7 @@ class OSMService:
                 'has_config': has_config,
                 'vehicle_types': vehicle_types,
                 'vehicle_types_display': self._format_vehicle_types(vehicle_types),
-                'size_mb': sum(f.stat().st_size for f in files if f.is_file()) / (1024 * 1024),
+                'size_mb': sum(entry.stat().st_size for entry in files) / (1024 * 1024),
                 'status': 'ready_for_import'
             }
             
@@ -0,0 +1,23 @@
+"""
+Shared pytest setup for backend tests
+
+Makes the backend modules importable the same way app.py imports them.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.service import DatabaseService
+
+
+@pytest.fixture
+def db_service(tmp_path):
+    """DatabaseService backed by a fresh SQLite file"""
+    service = DatabaseService(tmp_path / "test.db")
+    yield service
+    service.close_session()
+    service.engine.dispose()
@@ -0,0 +1,38 @@
+"""
+Tests for DatabaseService bulk row inserts
+"""
+
+
+def test_save_time_series_with_mixed_keys(db_service):
+    """Rows missing keys that other rows set are stored with NULLs"""
+    db_service.create_session('s1')
+    rows = [
+        {'time_step': 0.0, 'running_vehicles': 1},
+        {'time_step': 1.0, 'mean_speed': 12.5},
+        {'time_step': 2.0, 'running_vehicles': 3, 'collisions': 1},
+    ]
+    
+    assert db_service.save_time_series('s1', rows)
+    
+    saved = db_service.get_time_series('s1')
+    assert [(row['time_step'], row['running_vehicles'], row['mean_speed'], row['collisions']) for row in saved] == [
+        (0.0, 1, None, None),
+        (1.0, None, 12.5, None),
+        (2.0, 3, None, 1),
+    ]
+    assert {row['session_id'] for row in saved} == {'s1'}
+
+
+def test_save_trips_with_mixed_keys(db_service):
+    """A first row with fewer keys does not drop later rows' values"""
+    db_service.create_session('s1')
+    rows = [
+        {'vehicle_id': 'v0'},
+        {'vehicle_id': 'v1', 'duration': 42.0, 'route_length': 850.0},
+    ]
+    
+    assert db_service.save_trips('s1', rows)
+    
+    saved = {row['vehicle_id']: row for row in db_service.iter_trips('s1')}
+    assert saved['v0']['duration'] is None
+    assert (saved['v1']['duration'], saved['v1']['route_length']) == (42.0, 850.0)
@@ -0,0 +1,69 @@
+"""
+Tests for DatabaseService on database files created by older schemas
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.schema import CreateTable
+
+from database.models import Base
+from database.service import DatabaseService
+
+
+@pytest.fixture
+def old_db_path(tmp_path):
+    """SQLite file whose foreign keys to sessions lack ON DELETE CASCADE"""
+    path = tmp_path / "old.db"
+    engine = create_engine(f'sqlite:///{path}')
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            ddl = str(CreateTable(table).compile(engine)).replace(' ON DELETE CASCADE', '')
+            connection.exec_driver_sql(ddl)
+    engine.dispose()
+    return path
+
+
+def _add_session(path, session_id: str, created_at: datetime):
+    """Insert a session with a KPI row and a live data row"""
+    with sqlite3.connect(path) as connection:
+        connection.execute("INSERT INTO sessions (id, status, created_at) VALUES (?, 'completed', ?)",
+                           (session_id, created_at.isoformat(' ')))
+        connection.execute("INSERT INTO kpis (session_id) VALUES (?)", (session_id,))
+        connection.execute("INSERT INTO live_data (session_id) VALUES (?)", (session_id,))
+
+
+def _session_ids(path, table: str) -> list:
+    with sqlite3.connect(path) as connection:
+        return sorted(row[0] for row in connection.execute(f"SELECT session_id FROM {table}"))
+
+
+def test_cleanup_old_data_without_cascade(old_db_path):
+    """Old sessions and their child rows are removed even without CASCADE"""
+    now = datetime.utcnow()
+    _add_session(old_db_path, 'old', now - timedelta(days=40))
+    _add_session(old_db_path, 'new', now - timedelta(days=1))
+    service = DatabaseService(old_db_path)
+    assert service._non_cascading_tables
+    
+    assert service.cleanup_old_data(days_old=30) == 1
+    
+    assert service.get_session_by_id('old') is None
+    assert service.get_session_by_id('new') is not None
+    assert _session_ids(old_db_path, 'kpis') == ['new']
+    assert _session_ids(old_db_path, 'live_data') == ['new']
+    service.engine.dispose()
+
+
+def test_delete_session_without_cascade(old_db_path):
+    """delete_session() clears child rows the schema does not cascade to"""
+    _add_session(old_db_path, 's1', datetime.utcnow())
+    service = DatabaseService(old_db_path)
+    
+    assert service.delete_session('s1')
+    
+    assert service.get_session_by_id('s1') is None
+    assert _session_ids(old_db_path, 'kpis') == []
+    service.engine.dispose()
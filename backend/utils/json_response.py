@@ -0,0 +1,18 @@
+"""
+orjson-backed JSON responses
+
+Drop-in replacement for Flask's jsonify that serializes with orjson straight
+to bytes instead of going through the standard library json module.
+"""
+
+import orjson
+from flask import Response
+
+
+def ojsonify(obj, status: int = 200) -> Response:
+    """Serialize obj with orjson into an application/json response"""
+    return Response(
+        orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+        status=status,
+        mimetype='application/json'
+    )